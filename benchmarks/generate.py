@@ -0,0 +1,123 @@
+"""Remindotron - benchmarks/generate.py
+
+Build a SQLite database filled with synthetic reminders for the benchmarks.
+Recurring reminders are spread over one period from today (a weekly
+reminder lands in the next 7 days, a yearly one in the next year), one-off
+reminders over the next two years, and a small share is overdue. The data
+is seeded, so the same size always gives the same database.
+
+usage: python benchmarks/generate.py PATH [--reminders 100000]"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# (recurrence, share of the reminders, days the dates are spread over)
+RECURRENCES = (
+    ("ONCE", 0.15, 730),
+    ("DAILY", 0.03, 1),
+    ("WEEKLY", 0.12, 7),
+    ("MONTHLY", 0.25, 31),
+    ("QUARTERLY", 0.10, 92),
+    ("YEARLY", 0.35, 365),
+)
+OVERDUE_SHARE = 0.02
+UNCATEGORIZED_SHARE = 0.10
+PRIORITIES = (range(0, 11), (2, 3, 5, 8, 12, 30, 12, 8, 5, 3, 2))
+BATCH_SIZE = 10_000
+
+
+def reminder_rows(
+    count: int, categories: int, today: date, rng: random.Random
+):
+    recurrences = [name for name, _, _ in RECURRENCES]
+    weights = [share for _, share, _ in RECURRENCES]
+    spread = {name: days for name, _, days in RECURRENCES}
+    now = datetime.now()
+    for index in range(count):
+        recurring = rng.choices(recurrences, weights)[0]
+        if rng.random() < OVERDUE_SHARE:
+            offset = -rng.randint(1, 30)
+        else:
+            offset = rng.randrange(spread[recurring])
+        yield {
+            "name": f"reminder {index}",
+            "description": (
+                f"synthetic reminder {index}" if rng.random() < 0.3 else None
+            ),
+            "date": today + timedelta(days=offset),
+            "priority": rng.choices(*PRIORITIES)[0],
+            "recurring": recurring,
+            "category_id": (
+                None
+                if rng.random() < UNCATEGORIZED_SHARE
+                else rng.randint(1, categories)
+            ),
+            "occurrence_count": 0,
+            "created": now,
+        }
+
+
+def build_database(
+    path: Path,
+    reminders: int,
+    categories: int | None = None,
+    seed: int = 42,
+) -> Path:
+    """Create a fresh database at path with the given number of reminders.
+
+    The number of categories defaults to one per 500 reminders."""
+    from itertools import islice
+
+    from sqlalchemy import create_engine, insert
+
+    from remindotron.database import upgrade_schema
+    from remindotron.models import Base, Reminder, ReminderCategory
+
+    categories = categories or max(10, reminders // 500)
+    path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed)
+    rows = reminder_rows(reminders, categories, date.today(), rng)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(ReminderCategory.__table__),
+            [{"name": f"category {index}"} for index in range(categories)],
+        )
+        while batch := list(islice(rows, BATCH_SIZE)):
+            conn.execute(insert(Reminder.__table__), batch)
+    # The schema a real database has: search table, data_version row and
+    # triggers, added after the bulk insert so it isn't slowed down by them
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--reminders", type=int, default=100_000)
+    parser.add_argument("--categories", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    build_database(
+        arguments.path,
+        arguments.reminders,
+        arguments.categories,
+        arguments.seed,
+    )
+    print(
+        f"Generated {arguments.reminders} reminders in {arguments.path} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Remindotron - benchmarks/gotify_stub.py
+
+A local stand-in for a Gotify server that accepts POST /message. It can
+add latency and fail the first requests, to exercise the retries of the
+notification outbox without a real server.
+
+Run it on its own and point GOTIFY_URL at it, or pass --drain N to fill a
+temporary database with N notifications and time how long the outbox takes
+to drain through the stub.
+
+usage: python benchmarks/gotify_stub.py [--port 8008] [--drain 200]"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class StubGotify(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, latency: float, fail_first: int) -> None:
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.received: list[dict] = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubGotify
+    protocol_version = "HTTP/1.1"
+    # Buffer the headers and body into one write, otherwise Nagle's algorithm
+    # adds a delayed-ACK pause to every kept-alive request
+    wbufsize = -1
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+            failing = self.server.requests <= self.server.fail_first
+            if not failing:
+                self.server.received.append(json.loads(body))
+                message_id = len(self.server.received)
+        if self.path != "/message" or failing:
+            self.reply(500, {"error": "stub failure", "errorCode": 500})
+        else:
+            self.reply(200, {"id": message_id, **json.loads(body)})
+
+    def reply(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def serve(
+    port: int = 0, latency: float = 0, fail_first: int = 0
+) -> StubGotify:
+    """Start the stub in a background thread, port 0 picks a free port."""
+    server = StubGotify(port, latency, fail_first)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def drain(server: StubGotify, count: int, concurrency: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        from sqlalchemy import create_engine, func, select
+        from sqlalchemy.orm import sessionmaker
+
+        from remindotron.models import Base, Notification
+        from remindotron.notify import drain_outbox
+
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'outbox.db'}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(engine)
+        with session_factory() as db, db.begin():
+            db.add_all(
+                Notification(title=f"stub {index}", message="benchmark")
+                for index in range(count)
+            )
+
+        start = time.perf_counter()
+        report = drain_outbox(
+            session_factory,
+            f"http://127.0.0.1:{server.server_port}",
+            "stub-token",
+            concurrency=concurrency,
+            base_delay=0.01,
+        )
+        elapsed = time.perf_counter() - start
+        with session_factory() as db:
+            unsent = db.scalar(
+                select(func.count()).where(Notification.sent.is_(None))
+            )
+
+    print(
+        f"sent={report.sent} failed={report.failed} unsent={unsent} "
+        f"requests={server.requests} received={len(server.received)} "
+        f"in {elapsed:.3f}s ({count / elapsed:.0f} notifications/s)"
+    )
+    return 0 if unsent == 0 and len(server.received) >= count else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--drain", type=int, metavar="N")
+    parser.add_argument("--concurrency", type=int, default=4)
+    arguments = parser.parse_args()
+
+    server = serve(
+        0 if arguments.drain else arguments.port,
+        arguments.latency_ms / 1000,
+        arguments.fail_first,
+    )
+    if arguments.drain:
+        sys.exit(drain(server, arguments.drain, arguments.concurrency))
+
+    print(f"Gotify stub listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"received {len(server.received)} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Remindotron - benchmarks/healthcheck_under_load.py
+
+Measure /healthcheck latency on its own and while a burst of
+POST /reminders requests is in flight. Database access runs in the
+threadpool, so the healthcheck latency should stay flat; the script exits
+with status 1 when the p99 under load exceeds --max-slowdown times the idle
+p99 (with a floor of --min-budget-ms).
+
+usage: python benchmarks/healthcheck_under_load.py [--posts 500]"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def probe_healthcheck(
+    client, samples: int, interval: float
+) -> list[float]:
+    # The latency includes any delay in waking up after the interval, so
+    # time spent with the event loop blocked shows up in the numbers
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        response = await client.get("/healthcheck")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start - interval) * 1000)
+    return latencies
+
+
+async def post_burst(client, posts: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(index: int) -> None:
+        async with semaphore:
+            response = await client.post(
+                "/reminders",
+                json={
+                    "name": f"load {index}",
+                    "description": None,
+                    "date": date.today().isoformat(),
+                    "priority": 5,
+                    "recurring": "yearly",
+                    "category": {"name": f"load {index % 10}"},
+                },
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(post(index) for index in range(posts)))
+
+
+async def run(arguments: argparse.Namespace) -> int:
+    import httpx
+
+    from remindotron.api import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://remindotron"
+    ) as client:
+        idle = await probe_healthcheck(client, arguments.samples, 0.002)
+
+        burst = asyncio.create_task(
+            post_burst(client, arguments.posts, arguments.concurrency)
+        )
+        loaded = []
+        while not burst.done():
+            loaded += await probe_healthcheck(client, 1, 0.002)
+        await burst
+
+    idle_p99 = percentile(idle, 0.99)
+    loaded_p99 = percentile(loaded, 0.99)
+    budget = max(idle_p99 * arguments.max_slowdown, arguments.min_budget_ms)
+    print(
+        f"idle:   n={len(idle)} p50={statistics.median(idle):.2f}ms "
+        f"p99={idle_p99:.2f}ms"
+    )
+    print(
+        f"loaded: n={len(loaded)} p50={statistics.median(loaded):.2f}ms "
+        f"p99={loaded_p99:.2f}ms (budget {budget:.2f}ms)"
+    )
+    return 0 if loaded_p99 <= budget else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--max-slowdown", type=float, default=5.0)
+    parser.add_argument("--min-budget-ms", type=float, default=20.0)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "load.db"
+        os.environ["DATABASE_LOCATION"] = str(db_path)
+
+        from remindotron.database import make_engine, upgrade_schema
+
+        # The ASGI transport doesn't run the lifespan, which would do this
+        engine = make_engine(db_path)
+        upgrade_schema(engine)
+        engine.dispose()
+        sys.exit(asyncio.run(run(arguments)))
+
+
+if __name__ == "__main__":
+    main()
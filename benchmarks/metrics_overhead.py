@@ -0,0 +1,70 @@
+"""Remindotron - benchmarks/metrics_overhead.py
+
+Measure the per-request cost of the metrics middleware: a minimal ASGI app
+is called directly, with and without MetricsMiddleware around it, so the
+difference is the bookkeeping alone. Exits with status 1 when the median
+overhead exceeds --budget-us microseconds.
+
+usage: python benchmarks/metrics_overhead.py [--requests 20000]"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+
+class Route:
+    path = "/reminders"
+
+
+async def plain_app(scope, receive, send) -> None:
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+async def time_requests(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET"}, receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=25.0)
+    arguments = parser.parse_args()
+
+    from remindotron.metrics import MetricsMiddleware
+
+    wrapped = MetricsMiddleware(plain_app)
+    plain, instrumented = [], []
+    for _ in range(arguments.rounds):
+        plain.append(asyncio.run(time_requests(plain_app, arguments.requests)))
+        instrumented.append(
+            asyncio.run(time_requests(wrapped, arguments.requests))
+        )
+
+    overhead = statistics.median(instrumented) - statistics.median(plain)
+    print(
+        f"plain {statistics.median(plain):.2f}us, "
+        f"with metrics {statistics.median(instrumented):.2f}us, "
+        f"overhead {overhead:.2f}us per request "
+        f"(budget {arguments.budget_us:.2f}us)"
+    )
+    sys.exit(0 if overhead <= arguments.budget_us else 1)
+
+
+if __name__ == "__main__":
+    main()
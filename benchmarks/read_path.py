@@ -0,0 +1,230 @@
+"""Remindotron - benchmarks/read_path.py
+
+Compare the column-projection read path with the ORM path it replaced, on
+a generated database (see generate.py): a page of GET /reminders, the
+categories with embedded reminders of GET /categories, and loading the due
+reminders of the daily run into digests. The ORM side loads Reminder
+objects and validates pydantic models from their attributes, as the
+endpoints used to; the projection side is the code the endpoints run now.
+Both sides must produce the same bytes, so the script also guards that the
+lean path didn't change a response.
+
+usage: python benchmarks/read_path.py [--reminders 100000] [--repeats 5]"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import date, timedelta
+from pathlib import Path
+
+from generate import build_database
+
+
+def median_ms(function: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--per-category", type=int, default=20)
+    arguments = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="remindotron-read-"))
+    db_path = build_database(workdir / "read.db", arguments.reminders)
+    # The API module opens its engine on import
+    os.environ["DATABASE_LOCATION"] = str(db_path)
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import joinedload, selectinload
+
+    from remindotron import api
+    from remindotron.database import upgrade_schema
+    from remindotron.models import Reminder, ReminderCategory
+    from remindotron.notify import DueReminder, build_digests
+    from remindotron.queries import (
+        categories_with_reminders,
+        category_summaries,
+        due_reminders,
+        reminders_page,
+    )
+    from remindotron.schemas import (
+        ReminderBase,
+        ReminderCategorySummary,
+        ReminderCategoryWithReminders,
+        ReminderOut,
+        ReminderPage,
+    )
+
+    upgrade_schema(api.engine)
+    models_adapter = TypeAdapter(list[ReminderCategoryWithReminders])
+    limit, per_category = arguments.page_size, arguments.per_category
+    today = date.today()
+    # A day with plenty of due reminders, for the daily run
+    run_day = today + timedelta(days=3)
+
+    def orm_page() -> bytes:
+        with api.SessionLocal() as db:
+            reminders = db.scalars(
+                select(Reminder)
+                .options(joinedload(Reminder.category))
+                .order_by(Reminder.date, Reminder.id)
+                .limit(limit + 1)
+            ).all()
+            items = [ReminderOut.model_validate(item) for item in reminders]
+            next_cursor = api.encode_cursor(reminders[limit - 1])
+            page = ReminderPage(items=items[:limit], next_cursor=next_cursor)
+            return page.model_dump_json().encode()
+
+    def rows_page() -> bytes:
+        with api.SessionLocal() as db:
+            rows = db.execute(reminders_page(limit)).all()
+            return api.page_adapter.dump_json(
+                {
+                    "items": [
+                        api.reminder_item(row, row.category)
+                        for row in rows[:limit]
+                    ],
+                    "next_cursor": api.encode_cursor(rows[limit - 1]),
+                }
+            )
+
+    def orm_categories() -> bytes:
+        with api.SessionLocal() as db:
+            summaries = [
+                ReminderCategorySummary.model_validate(row._mapping)
+                for row in db.execute(category_summaries(today))
+            ]
+            ranked = select(
+                Reminder.id,
+                func.row_number()
+                .over(
+                    partition_by=Reminder.category_id,
+                    order_by=(Reminder.date, Reminder.id),
+                )
+                .label("rank"),
+            ).subquery()
+            capped = select(ranked.c.id).where(ranked.c.rank <= per_category)
+            categories = db.scalars(
+                select(ReminderCategory).options(
+                    selectinload(
+                        ReminderCategory.reminders.and_(
+                            Reminder.id.in_(capped)
+                        )
+                    )
+                )
+            ).all()
+            embedded = {
+                category.id: sorted(
+                    category.reminders, key=lambda item: (item.date, item.id)
+                )
+                for category in categories
+            }
+            return models_adapter.dump_json(
+                [
+                    ReminderCategoryWithReminders(
+                        **summary.model_dump(),
+                        reminders=[
+                            ReminderBase.model_validate(item)
+                            for item in embedded.get(summary.id, [])
+                        ],
+                    )
+                    for summary in summaries
+                ]
+            )
+
+    def rows_categories() -> bytes:
+        with api.SessionLocal() as db:
+            summaries = [
+                row._asdict() for row in db.execute(category_summaries(today))
+            ]
+            names = {summary["id"]: summary["name"] for summary in summaries}
+            embedded: dict[int, list] = {}
+            for row in db.execute(categories_with_reminders(per_category)):
+                embedded.setdefault(row.category_id, []).append(
+                    api.reminder_item(row, names[row.category_id])
+                )
+            return api.embedded_adapter.dump_json(
+                [
+                    {**summary, "reminders": embedded.get(summary["id"], [])}
+                    for summary in summaries
+                ]
+            )
+
+    def orm_run() -> list:
+        with api.SessionLocal() as db:
+            reminders = db.scalars(
+                select(Reminder)
+                .options(joinedload(Reminder.category))
+                .where(Reminder.date == run_day)
+                .order_by(Reminder.id)
+            ).all()
+            # What the digests read, taken from the loaded objects
+            due = [
+                DueReminder(
+                    item.id,
+                    item.name,
+                    item.priority,
+                    item.category.name if item.category else None,
+                )
+                for item in reminders
+            ]
+            return [
+                (item.title, item.message)
+                for item in build_digests(due, run_day)
+            ]
+
+    def rows_run() -> list:
+        with api.SessionLocal() as db:
+            reminders = [
+                DueReminder._make(row)
+                for row in db.execute(
+                    due_reminders(run_day).order_by(Reminder.id)
+                )
+            ]
+            return [
+                (item.title, item.message)
+                for item in build_digests(reminders, run_day)
+            ]
+
+    cases = {
+        f"GET /reminders (limit {limit})": (orm_page, rows_page),
+        f"GET /categories (reminders {per_category})": (
+            orm_categories,
+            rows_categories,
+        ),
+        "daily run digests": (orm_run, rows_run),
+    }
+    mismatches = 0
+    print(
+        f"{arguments.reminders} reminders, median of {arguments.repeats} runs"
+    )
+    for name, (orm_path, rows_path) in cases.items():
+        if orm_path() != rows_path():
+            print(f"{name}: output differs between the paths")
+            mismatches += 1
+            continue
+        orm_ms = median_ms(orm_path, arguments.repeats)
+        rows_ms = median_ms(rows_path, arguments.repeats)
+        print(
+            f"{name}: ORM {orm_ms:.1f}ms, rows {rows_ms:.1f}ms, "
+            f"{orm_ms / rows_ms:.1f}x"
+        )
+    api.engine.dispose()
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Remindotron - benchmarks/startup.py
+
+Check the CLI cold start against the budget in startup_budget.json: the
+cumulative import time of remindotron.remindotron as reported by
+`python -X importtime`, and the wall time of `remindotron --version`. Both
+are the median of --runs runs. Exits with status 1 when over budget, and
+--update writes the measured values (plus headroom) as the new budget.
+
+usage: python benchmarks/startup.py [--runs 7] [--update]"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).with_name("startup_budget.json")
+HEADROOM = 1.5
+
+
+def import_time_ms(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def version_time_ms() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "remindotron.remindotron", "--version"],
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--update", action="store_true", help="write a new budget"
+    )
+    arguments = parser.parse_args()
+
+    measured = {
+        "import_ms": statistics.median(
+            import_time_ms("remindotron.remindotron")
+            for _ in range(arguments.runs)
+        ),
+        "version_ms": statistics.median(
+            version_time_ms() for _ in range(arguments.runs)
+        ),
+    }
+
+    if arguments.update:
+        budget = {
+            key: round(value * HEADROOM) for key, value in measured.items()
+        }
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"Wrote {BUDGET_FILE}: {budget}")
+        return
+
+    budget = json.loads(BUDGET_FILE.read_text())
+    over_budget = False
+    for key, value in measured.items():
+        status = "ok" if value <= budget[key] else "OVER BUDGET"
+        over_budget |= value > budget[key]
+        print(f"{key}: {value:.1f} (budget {budget[key]}) {status}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
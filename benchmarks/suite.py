@@ -0,0 +1,316 @@
+"""Remindotron - benchmarks/suite.py
+
+Time the CLI and API hot paths on generated databases (see generate.py):
+the daily run with handle_cron_hit, show_all, GET /reminders,
+GET /categories and POST /reminders through the FastAPI test client. The
+GET cases are timed once with an empty response cache and once (_cached)
+with the response already built for the current data version.
+Notifications go to the local Gotify stub, so the run includes the outbox
+drain without a real server.
+
+The results are written as JSON (--output), and --compare prints the
+change against an earlier result file, e.g. from the previous commit.
+
+usage: python benchmarks/suite.py [--sizes 10000 100000] [--output out.json]
+                                  [--compare baseline.json]"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import date, datetime
+from pathlib import Path
+
+from generate import build_database
+from gotify_stub import serve
+
+CASES = (
+    "run",
+    "handle_cron_hit",
+    "show_all",
+    "get_reminders",
+    "get_reminders_cached",
+    "get_reminders_deep",
+    "get_reminders_deep_cached",
+    "get_categories",
+    "get_categories_cached",
+    "post_reminders",
+)
+
+
+def measure(
+    function: Callable[[], object],
+    repeats: int,
+    setup: Callable[[], object] | None = None,
+) -> dict[str, float]:
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "repeats": repeats,
+    }
+
+
+def copy_database(base: Path, work: Path) -> None:
+    # A stale WAL file of the previous copy would corrupt the new one
+    for suffix in ("-wal", "-shm"):
+        Path(f"{work}{suffix}").unlink(missing_ok=True)
+    shutil.copyfile(base, work)
+
+
+def bind_cli(db_path: Path | None) -> None:
+    from sqlalchemy.orm import sessionmaker
+
+    import remindotron.remindotron as cli
+    from remindotron.database import make_engine, upgrade_schema
+
+    if getattr(cli, "engine", None) is not None:
+        cli.engine.dispose()
+        cli.engine = None
+    if db_path is None:
+        return
+    cli.engine = make_engine(db_path)
+    cli.Session = sessionmaker(bind=cli.engine)
+    upgrade_schema(cli.engine)
+
+
+def cli_cases(
+    base: Path, work: Path, repeats: int, skip: list[str]
+) -> dict[str, dict]:
+    from rich.console import Console
+
+    import remindotron.remindotron as cli
+
+    def fresh_copy() -> None:
+        # The run advances the due reminders, start every repeat from the
+        # same state
+        bind_cli(None)
+        copy_database(base, work)
+        bind_cli(work)
+
+    def run() -> None:
+        cli.run_date_comparison(
+            silent=False,
+            catch_up=False,
+            digest="single",
+            max_items=None,
+            max_bytes=None,
+            concurrency=4,
+        )
+
+    def cron_hit() -> None:
+        with cli.Session() as db, db.begin():
+            cli.handle_cron_hit(db, date.today())
+            db.rollback()
+
+    console = Console(file=io.StringIO(), width=200)
+    cli.get_console = lambda: console
+
+    def show() -> None:
+        console.file = io.StringIO()
+        cli.show_all(
+            limit=None,
+            offset=0,
+            due_within=None,
+            category=None,
+            sort="id",
+            format="table",
+        )
+
+    results = {}
+    if "run" not in skip:
+        results["run"] = measure(run, repeats, fresh_copy)
+    if "handle_cron_hit" not in skip:
+        results["handle_cron_hit"] = measure(cron_hit, repeats, fresh_copy)
+    if "show_all" not in skip:
+        bind_cli(work)
+        results["show_all"] = measure(show, repeats)
+    bind_cli(None)
+    return results
+
+
+def api_cases(work: Path, repeats: int, skip: list[str]) -> dict[str, dict]:
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from remindotron import api
+    from remindotron.database import make_engine, upgrade_schema
+
+    engine = make_engine(work)
+    # The test client doesn't run the lifespan, upgrade the copy like the
+    # API startup does
+    upgrade_schema(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    def get_db():
+        with session_factory() as db:
+            yield db
+
+    api.app.dependency_overrides[api.get_db] = get_db
+    client = TestClient(api.app)
+
+    def get(url: str) -> Callable[[], object]:
+        def request() -> object:
+            response = client.get(url)
+            response.raise_for_status()
+            return response
+
+        return request
+
+    def get_case(url: str, cached: bool) -> dict[str, float]:
+        request = get(url)
+        # Warm: build the entry once, every repeat is then served from it.
+        # Cold: drop the entries, so every repeat queries and serializes.
+        setup = request if cached else api.response_cache.clear
+        return measure(request, repeats, setup)
+
+    # Up to 50 pages in, or the last page on a small database
+    cursor = None
+    for _ in range(50):
+        url = "/reminders?limit=100" + (f"&cursor={cursor}" if cursor else "")
+        next_cursor = client.get(url).json()["next_cursor"]
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+
+    counter = iter(range(10**9))
+
+    def post() -> None:
+        index = next(counter)
+        response = client.post(
+            "/reminders",
+            json={
+                "name": f"benchmark {index}",
+                "description": None,
+                "date": date.today().isoformat(),
+                "priority": 5,
+                "recurring": "yearly",
+                "category": {"name": f"category {index % 10}"},
+            },
+        )
+        response.raise_for_status()
+
+    urls = {
+        "get_reminders": "/reminders?limit=100",
+        "get_reminders_deep": f"/reminders?limit=100&cursor={cursor}",
+        "get_categories": "/categories",
+    }
+    results = {}
+    for case, url in urls.items():
+        if case not in skip:
+            results[case] = get_case(url, cached=False)
+        if f"{case}_cached" not in skip:
+            results[f"{case}_cached"] = get_case(url, cached=True)
+    # Last, it changes the data version
+    if "post_reminders" not in skip:
+        results["post_reminders"] = measure(post, repeats)
+    api.app.dependency_overrides.clear()
+    engine.dispose()
+    return results
+
+
+def git_commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def compare(results: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())["results"]
+    print(
+        f"{'size':>8} {'case':<26} {'before':>10} {'after':>10} {'change':>8}"
+    )
+    for size, cases in results.items():
+        for case, stats in cases.items():
+            before = baseline.get(size, {}).get(case)
+            if not before:
+                continue
+            change = stats["median_ms"] / before["median_ms"] - 1
+            print(
+                f"{size:>8} {case:<26} {before['median_ms']:>8.2f}ms "
+                f"{stats['median_ms']:>8.2f}ms {change:>+7.1%}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--skip", nargs="*", choices=CASES, default=[])
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="earlier result file to compare with"
+    )
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_LOCATION"] = str(Path(tmp) / "api.db")
+        server = serve()
+        import remindotron.remindotron as cli
+
+        cli.GOTIFY_URL = f"http://127.0.0.1:{server.server_port}"
+        cli.GOTIFY_APP_TOKEN = "stub-token"
+        logging.getLogger("remindotron.logging").setLevel(logging.WARNING)
+
+        results: dict[str, dict] = {}
+        for size in arguments.sizes:
+            print(f"Generating {size} reminders...", file=sys.stderr)
+            base = build_database(Path(tmp) / f"base-{size}.db", size)
+            work = Path(tmp) / f"work-{size}.db"
+            copy_database(base, work)
+            results[str(size)] = cli_cases(
+                base, work, arguments.repeats, arguments.skip
+            )
+            copy_database(base, work)
+            results[str(size)].update(
+                api_cases(work, arguments.repeats, arguments.skip)
+            )
+            for case, stats in results[str(size)].items():
+                print(
+                    f"{size:>8} {case:<26} median {stats['median_ms']:.2f}ms",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": arguments.repeats,
+            "gotify_messages": len(server.received),
+        },
+        "results": results,
+    }
+    if arguments.output:
+        arguments.output.write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+    if arguments.compare:
+        compare(results, arguments.compare)
+
+
+if __name__ == "__main__":
+    main()
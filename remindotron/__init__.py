@@ -1,3 +1,7 @@
-from importlib.metadata import version
+def __getattr__(name: str) -> str:
+    # importlib.metadata is slow to import, only look the version up on use
+    if name == "__version__":
+        from importlib.metadata import version
 
-__version__ = version("remindotron")
+        return version("remindotron")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,72 @@
+import asyncio
+import json
 import os
-from datetime import date, datetime
-from typing import Optional
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import Any, Optional
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, Response, status
-from pydantic import BaseModel, ConfigDict
-from sqlalchemy import create_engine
-from sqlalchemy.exc import NoResultFound
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlalchemy.exc import NoResultFound, OperationalError
 from sqlalchemy.orm import Session, sessionmaker
 
+from remindotron.bulk import chunked, insert_reminders, resolve_categories
+from remindotron.cache import ResponseCache, data_version, etag, etag_matches
+from remindotron.database import make_engine, upgrade_schema
+from remindotron.events import Notifier, watch_due
+from remindotron.metrics import (
+    REGISTRY,
+    MetricsMiddleware,
+    TimedQueuePool,
+    count_rows,
+    instrument_engine,
+)
 from remindotron.models import Recurring, Reminder, ReminderCategory
+from remindotron.queries import (
+    categories_with_reminders,
+    category_summaries,
+    due_reminder_items,
+    export_categories,
+    export_reminders,
+    occurrence_groups,
+    reminder_items,
+    reminders_page,
+    search_expression,
+    search_reminders,
+)
+from remindotron.recurrence import forecast
+from remindotron.schemas import (
+    ReminderBatchResult,
+    ReminderCategoryExport,
+    ReminderCategoryIn,
+    ReminderCategorySummary,
+    ReminderCategorySummaryRow,
+    ReminderCategoryWithReminders,
+    ReminderCategoryWithRemindersRow,
+    ReminderExport,
+    ReminderIn,
+    ReminderPage,
+    ReminderPageRow,
+    ReminderRow,
+    ReminderSearchPage,
+    ReminderSearchPageRow,
+    Upcoming,
+    UpcomingDay,
+)
 
 load_dotenv()
 
@@ -17,46 +74,106 @@ DATABASE_LOCATION = os.getenv("DATABASE_LOCATION")
 if not DATABASE_LOCATION:
     raise ValueError("Could not read database location from environment")
 
-engine = create_engine(url=f"sqlite:///{DATABASE_LOCATION}?journal_mode=wal")
+# Endpoints that touch the database are plain functions, which FastAPI runs
+# in its threadpool so a slow query never blocks the event loop. The pool is
+# bounded, so a burst of requests waits for a connection instead of opening
+# a new one per thread.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+# SQLite pragma profile ("durable" or "fast") and extra "name=value" pragmas
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE")
+DATABASE_PRAGMAS = os.getenv("DATABASE_PRAGMAS")
+
+engine = make_engine(
+    DATABASE_LOCATION,
+    DATABASE_PROFILE,
+    DATABASE_PRAGMAS,
+    pool_size=DATABASE_POOL_SIZE,
+    max_overflow=0,
+    poolclass=TimedQueuePool,
+    pool_timeout=DATABASE_POOL_TIMEOUT,
+)
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine)
 
+EXPORT_BATCH_SIZE = 1000
+SEARCH_MAX_OFFSET = 10_000
+# Serialized list responses, reused while the data version is unchanged
+response_cache = ResponseCache()
+page_adapter = TypeAdapter(ReminderPageRow)
+search_page_adapter = TypeAdapter(ReminderSearchPageRow)
+summaries_adapter = TypeAdapter(list[ReminderCategorySummaryRow])
+embedded_adapter = TypeAdapter(list[ReminderCategoryWithRemindersRow])
+CATEGORY_MAX_REMINDERS = 100
+UPCOMING_MAX_DAYS = 3660
+# Reminder events for the SSE stream. Only writes through this process are
+# published: the CLI and other API workers don't reach its subscribers.
+notifier = Notifier()
+items_adapter = TypeAdapter(list[ReminderRow])
+EVENT_MAX_ITEMS = 100
+
+
+def publish_due(db: Session, today: date) -> int:
+    rows = db.execute(due_reminder_items(today)).all()
+    for chunk in chunked(rows, EVENT_MAX_ITEMS):
+        notifier.publish(
+            "due",
+            items_adapter.dump_json(
+                [reminder_item(row, row.category) for row in chunk]
+            ),
+        )
+    return len(rows)
 
-class ReminderCategoryBase(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    name: str
-
-
-class ReminderCategoryIn(ReminderCategoryBase):
-    pass
 
+async def publish_due_today(today: date) -> int:
+    def publish() -> int:
+        with SessionLocal() as db:
+            return publish_due(db, today)
 
-class ReminderIn(BaseModel):
-    name: str
-    description: Optional[str]
-    date: date
-    priority: int
-    recurring: Recurring
-    category: ReminderCategoryBase
+    return await run_in_threadpool(publish)
 
 
-class ReminderBase(ReminderIn):
-    model_config = ConfigDict(from_attributes=True)
-    id: int
-    last_occurrence: Optional[datetime]
-    occurrence_count: int
-    created: datetime
+def publish_created(db: Session, ids: list[int]) -> None:
+    # Read back after the commit, so the events carry the stored rows in
+    # the format of GET /reminders; skipped until a client subscribed
+    if not notifier.active:
+        return
+    today = date.today()
+    for chunk in chunked(ids, EVENT_MAX_ITEMS):
+        items = [
+            reminder_item(row, row.category)
+            for row in db.execute(reminder_items(chunk))
+        ]
+        notifier.publish("created", items_adapter.dump_json(items))
+        # Created for today, so already due
+        due = [item for item in items if item["date"] == today]
+        if due:
+            notifier.publish("due", items_adapter.dump_json(due))
 
 
-class ReminderCategoryOut(ReminderCategoryBase):
-    id: int
-    reminders: list[ReminderBase]
+def prepare_schema() -> None:
+    try:
+        upgrade_schema(engine)
+    except OperationalError:
+        # Another worker upgraded it between our check and our DDL; the
+        # second pass only finds what is still missing
+        upgrade_schema(engine)
 
 
-class ReminderOut(ReminderBase):
-    category: ReminderCategoryBase
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Like the CLI, bring a database of an older version up to date: search
+    # needs the FTS table, the response cache the data_version row
+    await run_in_threadpool(prepare_schema)
+    notifier.bind(asyncio.get_running_loop())
+    due_checker = asyncio.create_task(watch_due(notifier, publish_due_today))
+    yield
+    due_checker.cancel()
+    notifier.close()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
 def get_db():
@@ -67,38 +184,194 @@ def get_db():
         db.close()
 
 
-@app.get("/reminders")
-async def get_reminders(db: Session = Depends(get_db)) -> list[ReminderOut]:
-    db_reminders = db.query(Reminder).all()
-    response = [ReminderOut.model_validate(item) for item in db_reminders]
-    return response
+def reminder_item(row: Row[Any], category: Optional[str]) -> ReminderRow:
+    # A row of the reminder columns with the category name nested, in the
+    # field order of ReminderOut
+    return {
+        "name": row.name,
+        "description": row.description,
+        "date": row.date,
+        "priority": row.priority,
+        "recurring": row.recurring,
+        "category": {"name": category} if category is not None else None,
+        "id": row.id,
+        "last_occurrence": row.last_occurrence,
+        "occurrence_count": row.occurrence_count,
+        "created": row.created,
+    }
+
+
+def encode_cursor(item: Row[Any]) -> str:
+    return f"{item.date.isoformat()}_{item.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        cursor_date, cursor_id = cursor.split("_")
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except ValueError:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"Invalid cursor {cursor}"
+        )
+
+
+def cached_response(
+    request: Request,
+    db: Session,
+    if_none_match: Optional[str],
+    build: Callable[[], bytes],
+    variant: str = "",
+) -> Response:
+    # One indexed lookup of the data version decides: an unchanged poll gets
+    # a 304 and a repeated one the stored body, both without running the
+    # query or validating a single model
+    version = data_version(db)
+    if version is None:
+        return Response(build(), media_type="application/json")
+    tag = etag(version, variant)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, tag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    body = response_cache.get_or_build(
+        f"{request.url.path}?{request.url.query}", tag, build
+    )
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/reminders", response_model=ReminderPage)
+def get_reminders(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    priority_min: Optional[int] = None,
+    recurring: Optional[Recurring] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Response:
+    def build() -> bytes:
+        rows = db.execute(
+            reminders_page(
+                limit,
+                after=decode_cursor(cursor) if cursor else None,
+                date_from=date_from,
+                date_to=date_to,
+                category=category,
+                priority_min=priority_min,
+                recurring=recurring,
+            )
+        ).all()
+        items = [reminder_item(row, row.category) for row in rows[:limit]]
+        count_rows(len(items))
+        next_cursor = (
+            encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        )
+        return page_adapter.dump_json(
+            {"items": items, "next_cursor": next_cursor}
+        )
+
+    return cached_response(request, db, if_none_match, build)
+
+
+@app.get("/reminders/search", response_model=ReminderSearchPage)
+def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Response:
+    expression = search_expression(q)
+    if expression is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Search needs at least one word"
+        )
+
+    def build() -> bytes:
+        rows = db.execute(search_reminders(expression, limit, offset)).all()
+        items = [reminder_item(row, row.category) for row in rows[:limit]]
+        count_rows(len(items))
+        return search_page_adapter.dump_json(
+            {
+                "items": items,
+                "next_offset": offset + limit if len(rows) > limit else None,
+            }
+        )
+
+    return cached_response(request, db, if_none_match, build)
+
+
+@app.get("/reminders/due/stream")
+async def stream_due(
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """Server-Sent Events: `due` when reminders become due (at midnight, or
+    when created for today), `created` and `deleted` on writes. Each event
+    holds a JSON list, of reminders as in GET /reminders or of {"id": ...}
+    for deletions. A reconnect with Last-Event-ID gets the recent events it
+    missed; fetch the current state with GET /reminders."""
+    return StreamingResponse(
+        notifier.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/upcoming")
+def get_upcoming(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+) -> Upcoming:
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=90)
+    if not 0 <= (date_to - date_from).days <= UPCOMING_MAX_DAYS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"to must be after from and at most {UPCOMING_MAX_DAYS} days "
+            "later",
+        )
+    groups = db.execute(occurrence_groups(date_from, date_to)).tuples()
+    days = [
+        UpcomingDay(date=day, count=sum(counts.values()), by_recurring=counts)
+        for day, counts in forecast(groups, date_from, date_to).items()
+    ]
+    count_rows(len(days))
+    return Upcoming(
+        date_from=date_from,
+        date_to=date_to,
+        total=sum(day.count for day in days),
+        days=days,
+    )
+
+
+def reminder_row(new_reminder: ReminderIn, category_id: int) -> dict[str, Any]:
+    return {
+        "name": new_reminder.name,
+        "description": new_reminder.description,
+        "date": new_reminder.date,
+        "priority": new_reminder.priority,
+        "recurring": new_reminder.recurring,
+        "category_id": category_id,
+    }
 
 
 @app.post("/reminders")
-async def create_reminder(
+def create_reminder(
     new_reminder: ReminderIn, db: Session = Depends(get_db)
 ) -> Response:
-    try:
-        cat = (
-            db.query(ReminderCategory)
-            .where(ReminderCategory.name == new_reminder.category.name)
-            .one()
-        )
-    except NoResultFound:
-        cat = ReminderCategory(name=new_reminder.name)
-        db.add(cat)
-        db.commit()
-        db.refresh(cat)
-    item = Reminder(
-        name=new_reminder.name,
-        description=new_reminder.description,
-        date=new_reminder.date,
-        priority=new_reminder.priority,
-        recurring=new_reminder.recurring,
-        category=cat,
+    categories = resolve_categories(db, [new_reminder.category.name])
+    ids = insert_reminders(
+        db,
+        [reminder_row(new_reminder, categories[new_reminder.category.name])],
     )
-    db.add(item)
     db.commit()
+    publish_created(db, ids)
     return Response(
         f"Reminder {new_reminder.name} created",
         headers={"Content-Type": "text/plain"},
@@ -106,14 +379,44 @@ async def create_reminder(
     )
 
 
+@app.post("/reminders/batch", status_code=status.HTTP_201_CREATED)
+def create_reminders_batch(
+    new_reminders: list[ReminderIn], db: Session = Depends(get_db)
+) -> list[ReminderBatchResult]:
+    # All categories are resolved up front and every reminder is inserted
+    # with a single executemany, committed once
+    categories = resolve_categories(
+        db, (item.category.name for item in new_reminders)
+    )
+    ids = insert_reminders(
+        db,
+        [
+            reminder_row(item, categories[item.category.name])
+            for item in new_reminders
+        ],
+    )
+    db.commit()
+    publish_created(db, ids)
+    return [
+        ReminderBatchResult(
+            index=index,
+            id=item_id,
+            name=item.name,
+            category_id=categories[item.category.name],
+        )
+        for index, (item, item_id) in enumerate(zip(new_reminders, ids))
+    ]
+
+
 @app.delete("/categories/{item_id}")
-async def delete_category(
-    item_id: int, db: Session = Depends(get_db)
-) -> Response:
+def delete_category(item_id: int, db: Session = Depends(get_db)) -> Response:
     try:
         item = db.query(Reminder).where(Reminder.id == item_id).one()
         db.delete(item)
         db.commit()
+        if notifier.active:
+            deleted = json.dumps([{"id": item_id}], separators=(",", ":"))
+            notifier.publish("deleted", deleted.encode())
         return Response(
             f"Reminder with id #{item_id} deleted",
             status_code=status.HTTP_200_OK,
@@ -125,19 +428,59 @@ async def delete_category(
         )
 
 
-@app.get("/categories")
-async def get_categories(
+@app.get(
+    "/categories",
+    response_model=list[ReminderCategoryWithReminders]
+    | list[ReminderCategorySummary],
+)
+def get_categories(
+    request: Request,
+    reminders: int = Query(
+        0,
+        ge=0,
+        le=CATEGORY_MAX_REMINDERS,
+        description="embed the first N reminders of every category by date",
+    ),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-) -> list[ReminderCategoryOut]:
-    db_categories = db.query(ReminderCategory).all()
-    response = [
-        ReminderCategoryOut.model_validate(item) for item in db_categories
-    ]
-    return response
+) -> Response:
+    today = date.today()
+
+    def build() -> bytes:
+        summaries: list[ReminderCategorySummaryRow] = [
+            {
+                "name": row.name,
+                "id": row.id,
+                "reminder_count": row.reminder_count,
+                "next_due": row.next_due,
+            }
+            for row in db.execute(category_summaries(today))
+        ]
+        count_rows(len(summaries))
+        if not reminders:
+            return summaries_adapter.dump_json(summaries)
+
+        names = {summary["id"]: summary["name"] for summary in summaries}
+        embedded: dict[int, list[ReminderRow]] = {}
+        for row in db.execute(categories_with_reminders(reminders)):
+            embedded.setdefault(row.category_id, []).append(
+                reminder_item(row, names[row.category_id])
+            )
+        return embedded_adapter.dump_json(
+            [
+                {**summary, "reminders": embedded.get(summary["id"], [])}
+                for summary in summaries
+            ]
+        )
+
+    # next_due moves on at midnight without any write
+    return cached_response(
+        request, db, if_none_match, build, variant=today.isoformat()
+    )
 
 
 @app.post("/categories")
-async def create_category(
+def create_category(
     new_category: ReminderCategoryIn, db: Session = Depends(get_db)
 ) -> Response:
     try:
@@ -145,7 +488,8 @@ async def create_category(
             ReminderCategory.name == new_category.name
         ).one()
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT, detail="Record already exists"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Record already exists",
         )
     except NoResultFound:
         cat = ReminderCategory(name=new_category.name)
@@ -159,6 +503,32 @@ async def create_category(
     )
 
 
+def export_lines() -> Iterator[bytes]:
+    # One read transaction for the whole export, so the stream is a
+    # consistent snapshot; rows are fetched EXPORT_BATCH_SIZE at a time
+    with SessionLocal() as db:
+        for category in db.scalars(export_categories(EXPORT_BATCH_SIZE)):
+            category_line = ReminderCategoryExport.model_validate(category)
+            count_rows(1)
+            yield category_line.model_dump_json().encode() + b"\n"
+        for reminder in db.scalars(export_reminders(EXPORT_BATCH_SIZE)):
+            reminder_line = ReminderExport.model_validate(reminder)
+            count_rows(1)
+            yield reminder_line.model_dump_json().encode() + b"\n"
+
+
+@app.get("/export.ndjson")
+async def export_ndjson() -> StreamingResponse:
+    return StreamingResponse(export_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/healthcheck")
 async def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
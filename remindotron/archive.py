@@ -0,0 +1,128 @@
+"""Remindotron - archive.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import ColumnElement, Delete, Engine, Insert
+from sqlalchemy.orm import QueryableAttribute, Session, sessionmaker
+
+from remindotron.models import Occurrence, Reminder
+from remindotron.queries import (
+    archive_occurrences,
+    archive_reminders,
+    batch_end,
+    delete_finished_reminders,
+    delete_old_occurrences,
+    finished_filter,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+# PRAGMA auto_vacuum value of incremental mode
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class ArchiveReport(NamedTuple):
+    reminders: int
+    occurrences: int
+
+
+def move_in_batches(
+    session_factory: sessionmaker[Session],
+    id_column: QueryableAttribute[int],
+    condition: ColumnElement[bool],
+    copy: Callable[[int], Insert],
+    remove: Callable[[int], Delete],
+    batch_size: int,
+    on_batch: Optional[Callable[[int], Any]] = None,
+) -> int:
+    """Copy the rows matching `condition` to their archive table and delete
+    them, `batch_size` rows per transaction.
+
+    Every batch is committed on its own, so the write lock is held briefly
+    and the API and the daily run can get in between batches."""
+    moved = 0
+    while True:
+        with session_factory() as db, db.begin():
+            up_to_id = db.scalar(batch_end(id_column, condition, batch_size))
+            if up_to_id is None:
+                return moved
+            db.execute(copy(up_to_id))
+            rows = db.execute(remove(up_to_id)).rowcount
+        moved += rows
+        if on_batch:
+            on_batch(rows)
+
+
+def archive(
+    session_factory: sessionmaker[Session],
+    before: datetime,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_batch: Optional[Callable[[int], Any]] = None,
+) -> ArchiveReport:
+    """Move ONCE reminders that fired and were due before `before`, and the
+    occurrence log rows written before it, into the archive tables."""
+    reminders = move_in_batches(
+        session_factory,
+        Reminder.id,
+        finished_filter(before.date()),
+        lambda up_to_id: archive_reminders(before.date(), up_to_id),
+        lambda up_to_id: delete_finished_reminders(before.date(), up_to_id),
+        batch_size,
+        on_batch,
+    )
+    occurrences = move_in_batches(
+        session_factory,
+        Occurrence.id,
+        Occurrence.fired < before,
+        lambda up_to_id: archive_occurrences(before, up_to_id),
+        lambda up_to_id: delete_old_occurrences(before, up_to_id),
+        batch_size,
+        on_batch,
+    )
+    return ArchiveReport(reminders, occurrences)
+
+
+def compact(engine: Engine) -> int:
+    """Release the pages freed by archiving to the file system and refresh
+    the planner statistics, returning the number of bytes released.
+
+    Databases created before the archive existed don't track free pages, so
+    the first call switches them to incremental auto-vacuum, which takes one
+    full VACUUM; after that only the free pages are released."""
+    # VACUUM can't run inside a transaction
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as conn:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar_one()
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar_one()
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar_one()
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            conn.exec_driver_sql(
+                f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}"
+            )
+            conn.exec_driver_sql("VACUUM")
+        else:
+            # Frees one page per step, and only executescript steps the
+            # pragma to the end instead of stopping after the first page
+            sqlite_connection = conn.connection.driver_connection
+            assert sqlite_connection is not None
+            sqlite_connection.executescript("PRAGMA incremental_vacuum")
+        conn.exec_driver_sql("ANALYZE")
+        remaining = conn.exec_driver_sql("PRAGMA page_count").scalar_one()
+    return (pages - remaining) * page_size
@@ -0,0 +1,201 @@
+"""Remindotron - bulk.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import csv
+import json
+from collections.abc import Callable, Iterable, Iterator
+from itertools import islice
+from typing import IO, Any, TypeVar, cast
+
+from pydantic import ValidationError
+from sqlalchemy import Table, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from remindotron.models import Reminder, ReminderCategory
+from remindotron.queries import export_rows
+from remindotron.schemas import ReminderImport
+
+T = TypeVar("T")
+
+EXPORT_FIELDS = (
+    "name",
+    "description",
+    "date",
+    "priority",
+    "recurring",
+    "category",
+    "last_occurrence",
+    "occurrence_count",
+)
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER for IN (...) lookups
+LOOKUP_CHUNK_SIZE = 500
+
+
+def lookup_categories(db: Session, names: list[str]) -> dict[str, int]:
+    found: dict[str, int] = {}
+    for start in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        chunk = names[start : start + LOOKUP_CHUNK_SIZE]
+        rows = db.execute(
+            select(ReminderCategory.name, ReminderCategory.id).where(
+                ReminderCategory.name.in_(chunk)
+            )
+        )
+        found.update(rows.tuples().all())
+    return found
+
+
+def resolve_categories(db: Session, names: Iterable[str]) -> dict[str, int]:
+    """Map category names to ids, creating the missing ones in bulk."""
+    unique_names = sorted(set(names))
+    categories = lookup_categories(db, unique_names)
+    missing = [name for name in unique_names if name not in categories]
+    if missing:
+        # Another writer may create the same category in the meantime
+        db.execute(
+            sqlite_insert(ReminderCategory).on_conflict_do_nothing(),
+            [{"name": name} for name in missing],
+        )
+        categories.update(lookup_categories(db, missing))
+    return categories
+
+
+def insert_reminders(db: Session, rows: list[dict[str, Any]]) -> list[int]:
+    """Insert all rows with one executemany and return their new ids in the
+    order of `rows`."""
+    if not rows:
+        return []
+    # A Core insert on the table skips the per-row ORM bookkeeping of an
+    # ORM bulk insert, which is several times slower for large batches
+    reminders = cast(Table, Reminder.__table__)
+    return list(
+        db.execute(
+            insert(reminders).returning(
+                reminders.c.id, sort_by_parameter_order=True
+            ),
+            rows,
+        ).scalars()
+    )
+
+
+### STREAMING IMPORT ###
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def read_rows(
+    stream: IO[str],
+    file_format: str,
+    on_error: Callable[[int, Exception], None],
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Yield the rows of a CSV or JSON Lines file with their line number.
+
+    Lines that don't parse are passed to `on_error` and skipped, like rows
+    that fail validation."""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            on_error(line_number, e)
+            continue
+        if not isinstance(row, dict):
+            on_error(line_number, ValueError("expected a JSON object"))
+            continue
+        # Category lines of /export.ndjson are recreated from the reminders
+        if row.get("type", "reminder") == "reminder":
+            yield line_number, row
+
+
+def validate_rows(
+    rows: Iterable[tuple[int, dict[str, Any]]],
+    on_error: Callable[[int, Exception], None],
+) -> Iterator[ReminderImport]:
+    for line_number, row in rows:
+        try:
+            yield ReminderImport.model_validate(row)
+        except ValidationError as e:
+            on_error(line_number, e)
+
+
+def import_chunk(db: Session, chunk: list[ReminderImport]) -> int:
+    categories = resolve_categories(
+        db, (item.category for item in chunk if item.category)
+    )
+    rows = [
+        {
+            **item.model_dump(exclude={"category"}),
+            "category_id": categories[item.category]
+            if item.category
+            else None,
+        }
+        for item in chunk
+    ]
+    return len(insert_reminders(db, rows))
+
+
+def import_reminders(
+    session_factory: sessionmaker[Session],
+    items: Iterable[ReminderImport],
+    chunk_size: int,
+    on_chunk: Callable[[int], None],
+) -> int:
+    # Every chunk is written and committed on its own, so memory use only
+    # depends on the chunk size and not on the size of the input
+    imported = 0
+    for chunk in chunked(items, chunk_size):
+        with session_factory() as db, db.begin():
+            count = import_chunk(db, chunk)
+        imported += count
+        on_chunk(count)
+    return imported
+
+
+### STREAMING EXPORT ###
+def export_reminder_rows(
+    session_factory: sessionmaker[Session],
+    stream: IO[str],
+    file_format: str,
+    chunk_size: int,
+    on_chunk: Callable[[int], None],
+) -> int:
+    exported = 0
+    writer = None
+    if file_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    with session_factory() as db:
+        result = db.execute(export_rows(chunk_size))
+        for partition in result.mappings().partitions():
+            for mapping in partition:
+                row = dict(mapping)
+                if writer:
+                    writer.writerow(row)
+                else:
+                    stream.write(json.dumps(row, default=str) + "\n")
+            exported += len(partition)
+            on_chunk(len(partition))
+    return exported
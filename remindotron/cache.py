@@ -0,0 +1,97 @@
+"""Remindotron - cache.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from remindotron.models import DataVersion
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def data_version(db: Session) -> Optional[int]:
+    """Return the current data version, None when the database has not been
+    upgraded with the data_version table yet (responses aren't cached)."""
+    try:
+        return db.scalar(
+            select(DataVersion.version).where(DataVersion.id == 1)
+        )
+    except OperationalError:
+        db.rollback()
+        return None
+
+
+def etag(version: int, variant: str = "") -> str:
+    # The variant covers responses that also change without a write, like
+    # ones that depend on today's date
+    return f'"v{version}-{variant}"' if variant else f'"v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or tag in tags
+
+
+class ResponseCache:
+    """Serialized responses of the list endpoints, keyed by URL and only
+    valid for the ETag (data version) they were built for.
+
+    Shared by the threadpool, so access is guarded by a lock; the least
+    recently used entries are dropped beyond max_entries."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str, tag: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.etag != tag:
+                return None
+            self.entries.move_to_end(key)
+            return entry.body
+
+    def get_or_build(
+        self, key: str, tag: str, build: Callable[[], bytes]
+    ) -> bytes:
+        body = self.get(key, tag)
+        if body is None:
+            # Built outside the lock: two threads may build the same entry
+            # once, which is cheaper than serializing every request
+            body = build()
+            with self.lock:
+                self.entries[key] = CachedResponse(tag, body)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return body
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
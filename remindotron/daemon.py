@@ -0,0 +1,205 @@
+"""Remindotron - daemon.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import heapq
+import logging
+import threading
+from collections.abc import Callable
+from datetime import date as DTDate
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import Connection, Engine, select
+
+from remindotron.models import DataVersion
+from remindotron.queries import fire_dates
+from remindotron.recurrence import Recurring, next_occurrence
+
+logger = logging.getLogger("remindotron.logging")
+
+FireCallback = Callable[[DTDate], dict[tuple[Recurring, DTDate], int]]
+SendCallback = Callable[[], object]
+
+
+class FireSchedule:
+    """Min-heap of the upcoming fire times.
+
+    Reminders only carry a date, and all reminders of one date fire together
+    through the set-based run, so the heap holds one entry per distinct date
+    instead of one per reminder. The dates are re-read whenever the database
+    changes, so deleted, moved and new reminders are all picked up."""
+
+    def __init__(self, fire_time: time) -> None:
+        self.fire_time = fire_time
+        self.heap: list[DTDate] = []
+        self.scheduled: set[DTDate] = set()
+
+    def push(self, reminder_date: DTDate) -> None:
+        if reminder_date not in self.scheduled:
+            self.scheduled.add(reminder_date)
+            heapq.heappush(self.heap, reminder_date)
+
+    def load(self, conn: Connection) -> int:
+        # A full re-read of the distinct dates rather than of the rows added
+        # since the last load: ids are reused after the highest row is
+        # deleted, and updates move reminders to other dates
+        dates = sorted(conn.execute(fire_dates()).scalars())
+        # A sorted list is a valid heap
+        self.heap = dates
+        self.scheduled = set(dates)
+        return len(dates)
+
+    def next_fire(self) -> datetime | None:
+        if not self.heap:
+            return None
+        return datetime.combine(self.heap[0], self.fire_time)
+
+    def pop_due(self, now: datetime) -> list[DTDate]:
+        due = []
+        while self.heap and (
+            datetime.combine(self.heap[0], self.fire_time) <= now
+        ):
+            reminder_date = heapq.heappop(self.heap)
+            self.scheduled.discard(reminder_date)
+            due.append(reminder_date)
+        return due
+
+
+class Daemon:
+    """Fire the scheduled dates and send the queued notifications.
+
+    Failures never stop the daemon: a firing that fails is logged and its
+    dates are retried after `poll_interval`, and notifications that could
+    not be sent stay in the outbox, which `send` drains every
+    `send_interval` seconds."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        fire: FireCallback,
+        fire_time: time,
+        poll_interval: float,
+        send: Optional[SendCallback] = None,
+        send_interval: float = 300,
+    ) -> None:
+        self.engine = engine
+        self.fire = fire
+        self.schedule = FireSchedule(fire_time)
+        self.poll_interval = poll_interval
+        self.send = send
+        self.send_interval = send_interval
+        self.stopped = threading.Event()
+        self.data_version: int | None = None
+        # Counter bumps of our own firings, which don't need a re-read
+        self.own_writes = 0
+        self.retry_fire: datetime | None = None
+        self.next_send: datetime | None = None
+
+    def stop(self, *args: object) -> None:
+        logger.info("Stopping daemon")
+        self.stopped.set()
+
+    def changed(self, conn: Connection) -> bool:
+        # The data_version counter is only bumped by writes to reminders and
+        # categories, so the outbox and the occurrence log don't trigger a
+        # re-read. Our own firing bumps it once per advanced reminder, which
+        # the schedule already accounts for; any other bump is someone else.
+        version = conn.scalar(
+            select(DataVersion.version).where(DataVersion.id == 1)
+        )
+        conn.rollback()
+        expected = (
+            self.data_version + self.own_writes
+            if self.data_version is not None
+            else None
+        )
+        self.data_version = version
+        self.own_writes = 0
+        return version != expected
+
+    def fire_due(self, now: datetime) -> None:
+        if self.retry_fire and now < self.retry_fire:
+            return
+        due = self.schedule.pop_due(now)
+        if not due:
+            return
+        today = now.date()
+        logger.info(f"Firing reminders for {', '.join(map(str, due))}")
+        try:
+            report = self.fire(today)
+        except Exception as e:
+            # Nothing was advanced; the dates fire again after the wait
+            logger.error(
+                f"Error firing reminders, retrying in {self.poll_interval}s: "
+                f"{e}"
+            )
+            for reminder_date in due:
+                self.schedule.push(reminder_date)
+            self.retry_fire = now + timedelta(seconds=self.poll_interval)
+            return
+        self.retry_fire = None
+        self.own_writes += sum(report.values())
+        # The set-based run moved every fired group to its next date
+        for recurring, current in report:
+            if recurring != Recurring.ONCE:
+                self.schedule.push(next_occurrence(current, recurring, today))
+        if report:
+            self.send_pending(now)
+
+    def send_pending(self, now: datetime) -> None:
+        if self.send is None:
+            return
+        self.next_send = now + timedelta(seconds=self.send_interval)
+        try:
+            self.send()
+        except Exception as e:
+            logger.error(
+                f"Error sending notifications, they stay in the outbox: {e}"
+            )
+
+    def wake_at(self) -> datetime | None:
+        next_fire = self.schedule.next_fire()
+        if next_fire and self.retry_fire:
+            next_fire = max(next_fire, self.retry_fire)
+        next_send = self.next_send if self.send else None
+        return min(filter(None, (next_fire, next_send)), default=None)
+
+    def run(self) -> None:
+        with self.engine.connect() as conn:
+            self.changed(conn)
+            loaded = self.schedule.load(conn)
+            conn.rollback()
+            logger.info(f"Scheduled {loaded} fire dates")
+
+            while not self.stopped.is_set():
+                if self.changed(conn):
+                    loaded = self.schedule.load(conn)
+                    conn.rollback()
+                    logger.debug(f"Rescheduled {loaded} fire dates")
+
+                now = datetime.now()
+                self.fire_due(now)
+                if self.next_send is None or now >= self.next_send:
+                    self.send_pending(now)
+
+                wake = self.wake_at()
+                timeout = self.poll_interval
+                if wake:
+                    until_next = (wake - datetime.now()).total_seconds()
+                    timeout = max(min(timeout, until_next), 0)
+                logger.debug(f"Next wake-up at {wake}, sleeping {timeout}s")
+                self.stopped.wait(timeout)
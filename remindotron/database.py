@@ -0,0 +1,264 @@
+"""Remindotron - database.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import re
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import (
+    ClauseElement,
+    Connection,
+    Engine,
+    create_engine,
+    event,
+    insert,
+    inspect,
+    select,
+    text,
+)
+
+from remindotron.models import Base, DataVersion
+
+# Pragmas applied to every new connection. Both profiles use WAL so readers
+# never block the writer, and wait up to 5s for a lock instead of failing
+# with "database is locked" when the CLI and API workers write at once.
+# "durable" syncs every commit to disk; "fast" only syncs at checkpoints
+# (a power loss can drop the last commits, never corrupt the database),
+# uses a larger page cache and memory-maps the file for reads.
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PROFILE = "durable"
+SQLITE_PRAGMAS = {
+    "journal_mode",
+    "synchronous",
+    "busy_timeout",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "foreign_keys",
+    "wal_autocheckpoint",
+}
+PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+# Writes to these tables bump data_version, see DataVersion
+VERSIONED_TABLES = ("reminders", "categories")
+
+# Full-text index over the name, description and category name of every
+# reminder, with the reminder id as rowid. It keeps its own copy of the
+# text (the category name isn't a column of reminders, so it can't be an
+# external-content table) and is kept in sync by triggers.
+SEARCH_TABLE = "reminders_fts"
+SEARCH_TABLE_DDL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    "name, description, category, tokenize = 'unicode61 remove_diacritics 2')"
+)
+SEARCH_TABLE_FILL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) "
+    "SELECT reminders.id, reminders.name, reminders.description, "
+    "categories.name FROM reminders "
+    "LEFT JOIN categories ON categories.id = reminders.category_id"
+)
+
+
+def sqlite_pragmas(
+    profile: Optional[str] = None, overrides: Optional[str] = None
+) -> dict[str, str | int]:
+    """Return the pragmas of a profile with `overrides` applied on top.
+
+    Overrides are given as "name=value,name=value", e.g. from the
+    DATABASE_PRAGMAS environment variable."""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown database profile {profile}, "
+            f"choose from {', '.join(SQLITE_PROFILES)}"
+        )
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for item in filter(None, (overrides or "").split(",")):
+        name, _, value = item.partition("=")
+        name, value = name.strip().lower(), value.strip()
+        # Pragmas can't be bound as parameters, so only accept known names
+        # and plain values before they end up in the statement
+        if name not in SQLITE_PRAGMAS or not PRAGMA_VALUE.match(value):
+            raise ValueError(f"Invalid database pragma {item!r}")
+        pragmas[name] = value
+    return pragmas
+
+
+def make_engine(
+    db_path: Path | str,
+    profile: Optional[str] = None,
+    overrides: Optional[str] = None,
+    **kwargs: Any,
+) -> Engine:
+    """Create the SQLite engine shared by the CLI and the API.
+
+    The pragmas of the profile are set on every new connection; the remaining
+    keyword arguments go to `create_engine` (echo, pool settings)."""
+    pragmas = sqlite_pragmas(profile, overrides)
+    engine = create_engine(f"sqlite:///{db_path}", **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        # Only takes effect on a new, empty file, before journal_mode writes
+        # its header; lets `archive` release freed pages without a full
+        # VACUUM. A no-op on existing databases.
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
+
+
+def active_pragmas(engine: Engine) -> dict[str, Any]:
+    """Read back the pragmas of a connection, for debug output."""
+    with engine.connect() as conn:
+        return {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in sorted(SQLITE_PRAGMAS)
+        }
+
+
+def data_version_triggers() -> dict[str, str]:
+    # SQLite has no statement-level triggers, so a multi-row write bumps the
+    # counter once per row; only the change matters to readers, not the
+    # amount
+    return {
+        f"bump_data_version_{table}_{operation.lower()}": (
+            f"CREATE TRIGGER IF NOT EXISTS "
+            f"bump_data_version_{table}_{operation.lower()} "
+            f"AFTER {operation} ON {table} BEGIN "
+            f"UPDATE {DataVersion.__tablename__} SET version = version + 1 "
+            f"WHERE id = 1; END"
+        )
+        for table in VERSIONED_TABLES
+        for operation in ("INSERT", "UPDATE", "DELETE")
+    }
+
+
+def search_triggers() -> dict[str, str]:
+    category_name = "(SELECT name FROM categories WHERE id = new.category_id)"
+    bodies = {
+        "reminders_insert": (
+            "AFTER INSERT ON reminders BEGIN "
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) "
+            f"VALUES (new.id, new.name, new.description, {category_name}); "
+            "END"
+        ),
+        # Only the indexed columns, the daily run's date updates don't touch
+        # the index
+        "reminders_update": (
+            "AFTER UPDATE OF name, description, category_id ON reminders "
+            f"BEGIN UPDATE {SEARCH_TABLE} SET name = new.name, "
+            f"description = new.description, category = {category_name} "
+            "WHERE rowid = old.id; END"
+        ),
+        "reminders_delete": (
+            "AFTER DELETE ON reminders BEGIN "
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; END"
+        ),
+        "categories_update": (
+            "AFTER UPDATE OF name ON categories BEGIN "
+            f"UPDATE {SEARCH_TABLE} SET category = new.name WHERE rowid IN "
+            "(SELECT id FROM reminders WHERE category_id = new.id); END"
+        ),
+        "categories_delete": (
+            "AFTER DELETE ON categories BEGIN "
+            f"UPDATE {SEARCH_TABLE} SET category = NULL WHERE rowid IN "
+            "(SELECT id FROM reminders WHERE category_id = old.id); END"
+        ),
+    }
+    return {
+        f"sync_{SEARCH_TABLE}_{name}": (
+            f"CREATE TRIGGER IF NOT EXISTS sync_{SEARCH_TABLE}_{name} {body}"
+        )
+        for name, body in bodies.items()
+    }
+
+
+def upgrade_schema(engine: Engine) -> list[str]:
+    """Bring an existing database up to date with the models.
+
+    `create_all` only creates missing tables, indexes of tables that already
+    exist are skipped, so those are created here one by one, followed by the
+    full-text search table and the data_version and search triggers.
+    Returns the names of everything that was created."""
+    created: list[str] = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                table.create(bind=conn)
+                created.append(table.name)
+                continue
+            existing_indexes = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    created.append(str(index.name))
+        if SEARCH_TABLE not in existing_tables:
+            # Filled before its triggers exist, from the current rows
+            conn.exec_driver_sql(SEARCH_TABLE_DDL)
+            conn.exec_driver_sql(SEARCH_TABLE_FILL)
+            created.append(SEARCH_TABLE)
+        existing_triggers = set(
+            conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            ).scalars()
+        )
+        triggers = {**data_version_triggers(), **search_triggers()}
+        for name, ddl in triggers.items():
+            if name not in existing_triggers:
+                conn.exec_driver_sql(ddl)
+                created.append(name)
+        if conn.scalar(select(DataVersion.id)) is None:
+            # Also for tables made by create_all, which leaves it empty
+            conn.execute(insert(DataVersion).values(id=1, version=0))
+        if created:
+            # Refresh the planner statistics for the new indexes
+            conn.execute(text("ANALYZE"))
+    return created
+
+
+def explain_query_plan(
+    conn: Connection, statement: ClauseElement
+) -> list[tuple[int, int, str]]:
+    compiled = statement.compile(
+        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+    return [(row[0], row[1], row[3]) for row in result]
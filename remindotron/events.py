@@ -0,0 +1,174 @@
+"""Remindotron - events.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date as DTDate
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+logger = logging.getLogger("remindotron.logging")
+
+# Events a subscriber may fall behind on before it is disconnected; it
+# reconnects and catches up with GET /reminders
+SUBSCRIBER_QUEUE_SIZE = 256
+# Messages kept to replay to a client that reconnects with Last-Event-ID
+REPLAY_SIZE = 1000
+# Comment line sent on idle streams, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15.0
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 5000
+
+
+def sse_message(event_id: str, event: str, data: bytes) -> bytes:
+    """One Server-Sent Events message; `data` is a single line of JSON."""
+    return f"id: {event_id}\nevent: {event}\ndata: ".encode() + data + b"\n\n"
+
+
+class Notifier:
+    """Fans events out to the SSE subscribers of this process.
+
+    Subscribers are queues read by their own stream, all on the event loop.
+    Publishers may be sync endpoints in the threadpool: `publish` hands the
+    message to the loop with call_soon_threadsafe and returns at once. A
+    message is encoded once and the same bytes are queued for everyone, so
+    an idle subscriber costs one queue and a keepalive timer.
+
+    Event ids are "<process start>-<sequence>", so a client reconnecting
+    with Last-Event-ID gets the messages it missed from the replay buffer,
+    and nothing from a buffer of another process."""
+
+    def __init__(
+        self,
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+        replay_size: int = REPLAY_SIZE,
+    ) -> None:
+        self.queue_size = queue_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: set[asyncio.Queue[Optional[bytes]]] = set()
+        self.epoch = str(int(datetime.now().timestamp()))
+        self.sequence = 0
+        self.history: deque[tuple[int, bytes]] = deque(maxlen=replay_size)
+        self.subscribed = False
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    @property
+    def active(self) -> bool:
+        # Lets publishers skip building events until a client has subscribed;
+        # from then on they are kept for replay, also while it reconnects
+        return self.loop is not None and self.subscribed
+
+    def subscribe(self) -> asyncio.Queue[Optional[bytes]]:
+        queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        self.subscribed = True
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[Optional[bytes]]) -> None:
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data: bytes) -> None:
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.fan_out, event, data)
+
+    def fan_out(self, event: str, data: bytes) -> None:
+        # Runs on the loop, which keeps the sequence in publishing order
+        self.sequence += 1
+        message = sse_message(f"{self.epoch}-{self.sequence}", event, data)
+        self.history.append((self.sequence, message))
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning(
+                    "Disconnecting an event subscriber that fell behind"
+                )
+                self.disconnect(queue)
+
+    def disconnect(self, queue: asyncio.Queue[Optional[bytes]]) -> None:
+        # Drop what it didn't read and end its stream with the sentinel
+        self.unsubscribe(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def close(self) -> None:
+        """End every stream that is still open at shutdown."""
+        for queue in list(self.subscribers):
+            self.disconnect(queue)
+        self.loop = None
+
+    def missed(self, last_event_id: Optional[str]) -> list[bytes]:
+        epoch, _, sequence = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return []
+        return [
+            message
+            for number, message in self.history
+            if number > int(sequence)
+        ]
+
+    async def stream(
+        self, last_event_id: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        # Taken together, so a message is either replayed or queued
+        queue = self.subscribe()
+        replay = self.missed(last_event_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            for message in replay:
+                yield message
+            while True:
+                try:
+                    queued = await asyncio.wait_for(
+                        queue.get(), KEEPALIVE_SECONDS
+                    )
+                except TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if queued is None:
+                    return
+                yield queued
+        finally:
+            self.unsubscribe(queue)
+
+
+async def watch_due(
+    notifier: Notifier,
+    publish_due: Callable[[DTDate], Awaitable[int]],
+) -> None:
+    """Publish the reminders of a day when it starts, once per process.
+
+    Sleeps until local midnight and then calls `publish_due` with the new
+    date, unless no client has subscribed yet, which skips the query."""
+    while True:
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), time())
+        await asyncio.sleep((midnight - now).total_seconds())
+        today = datetime.now().date()
+        if not notifier.active:
+            continue
+        try:
+            published = await publish_due(today)
+            logger.info(f"Published {published} reminders due on {today}")
+        except Exception as e:
+            logger.error(f"Error publishing the reminders due today: {e}")
@@ -16,13 +16,43 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>."""
 
 import logging
+import sys
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
+from types import TracebackType
+from typing import Optional
 
-from rich.logging import RichHandler
-from rich.traceback import install
 
-install(show_locals=False)
+def rich_excepthook(
+    exc_type: type[BaseException],
+    exc_value: BaseException,
+    traceback: Optional[TracebackType],
+) -> None:
+    # Only load rich's traceback renderer when an exception is uncaught
+    from rich.traceback import install
+
+    install(show_locals=False)
+    sys.excepthook(exc_type, exc_value, traceback)
+
+
+class LazyRichHandler(logging.Handler):
+    """Build the RichHandler on the first record that is actually emitted,
+    so importing and configuring the logger doesn't import rich."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.handler: Optional[logging.Handler] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.handler is None:
+            from rich.logging import RichHandler
+
+            self.handler = RichHandler(rich_tracebacks=True)
+            self.handler.setFormatter(self.formatter)
+        self.handler.emit(record)
+
+
+sys.excepthook = rich_excepthook
 
 
 def get_logger() -> logging.Logger:
@@ -35,7 +65,7 @@ def get_logger() -> logging.Logger:
     file_handler.setFormatter(file_formatter)
 
     rich_formatter = logging.Formatter(datefmt="[%X]", fmt="%(message)s")
-    rich_handler = RichHandler(rich_tracebacks=True)
+    rich_handler = LazyRichHandler()
     rich_handler.setFormatter(rich_formatter)
 
     logger = logging.getLogger(__name__)
@@ -0,0 +1,302 @@
+"""Remindotron - metrics.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+# A small Prometheus text-format registry, enough for counters and
+# histograms with labels, so the API doesn't need prometheus_client
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+STREAM_BUCKETS = (1, 10, 60, 300, 900, 3600, 14400, 86400)
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class Counter:
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(
+                    f"{self.name}{format_labels(self.labels, labels)} {value}"
+                )
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: count per bucket (plus +Inf), and the sum
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+                self.sums[labels] = 0
+            counts[index] += 1
+            self.sums[labels] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bucket_labels = (*self.labels, "le")
+        with self.lock:
+            for labels, counts in sorted(self.counts.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f"{self.name}_bucket"
+                        f"{format_labels(bucket_labels, (*labels, str(bound)))}"
+                        f" {cumulative}"
+                    )
+                suffix = format_labels(self.labels, labels)
+                lines.append(f"{self.name}_sum{suffix} {self.sums[labels]}")
+                lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(self, *args: Any, **kwargs: Any) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args: Any, **kwargs: Any) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return (
+            "\n".join(
+                line for metric in self.metrics for line in metric.render()
+            )
+            + "\n"
+        )
+
+
+# Per process: with several API workers a scrape only sees the one it hits
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter(
+    "remindotron_http_requests_total",
+    "HTTP requests by route and status code",
+    ("method", "route", "status"),
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "remindotron_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route"),
+)
+STREAM_DURATION = REGISTRY.histogram(
+    "remindotron_http_stream_duration_seconds",
+    "How long event streams stayed connected, by route",
+    ("method", "route"),
+    STREAM_BUCKETS,
+)
+ROWS_RETURNED = REGISTRY.counter(
+    "remindotron_rows_returned_total",
+    "Rows returned to clients by route",
+    ("route",),
+)
+SQL_STATEMENTS = REGISTRY.counter(
+    "remindotron_sql_statements_total",
+    "SQL statements executed by route",
+    ("method", "route"),
+)
+SQL_STATEMENTS_PER_REQUEST = REGISTRY.histogram(
+    "remindotron_sql_statements_per_request",
+    "SQL statements executed per request, a high count hints at N+1 queries",
+    ("method", "route"),
+    COUNT_BUCKETS,
+)
+SQL_DURATION = REGISTRY.histogram(
+    "remindotron_sql_statement_duration_seconds",
+    "SQL statement execution time by route",
+    ("method", "route"),
+    SQL_BUCKETS,
+)
+CONNECTION_WAIT = REGISTRY.histogram(
+    "remindotron_db_connection_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=SQL_BUCKETS,
+)
+
+
+### PER REQUEST ###
+class RequestStats:
+    __slots__ = ("statements", "sql_durations", "rows")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.sql_durations: list[float] = []
+        self.rows = 0
+
+
+# The stats object is shared with the threadpool, which runs the endpoint
+# in a copy of the request's context
+current_request: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request", default=None
+)
+
+
+def count_rows(rows: int) -> None:
+    stats = current_request.get()
+    if stats is not None:
+        stats.rows += rows
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool that records how long every checkout waits.
+
+    The session checks out its connection lazily, on the first statement
+    in the endpoint's thread, so the wait is timed there; checking out
+    early in the dependency would hold a connection while the endpoint
+    waits for a threadpool slot."""
+
+    def connect(self) -> PoolProxiedConnection:
+        start = perf_counter()
+        try:
+            return super().connect()
+        finally:
+            CONNECTION_WAIT.observe(perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement on the engine for the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn: Any, *args: Any) -> None:
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn: Any, *args: Any) -> None:
+        elapsed = perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        if stats is None:
+            SQL_STATEMENTS.inc(("", ""))
+            SQL_DURATION.observe(elapsed, ("", ""))
+        else:
+            stats.statements += 1
+            stats.sql_durations.append(elapsed)
+
+
+class MetricsMiddleware:
+    """Record latency, status, rows and SQL statements of every request.
+
+    A plain ASGI middleware: no request/response objects are built, the
+    bookkeeping is a few dictionary updates once the response is sent."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        streaming = False
+
+        async def send_wrapper(message: Any) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                streaming = any(
+                    name == b"content-type"
+                    and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            current_request.reset(token)
+            # The route template, so /categories/1 and /categories/2 share
+            # one label; unmatched paths are grouped to keep the label set
+            # small
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUESTS.inc((method, route, status))
+            # An event stream lasts as long as its client stays connected,
+            # which would swamp the latency of the route
+            if streaming:
+                STREAM_DURATION.observe(elapsed, (method, route))
+            else:
+                REQUEST_DURATION.observe(elapsed, (method, route))
+            if stats.rows:
+                ROWS_RETURNED.inc((route,), stats.rows)
+            if stats.statements:
+                SQL_STATEMENTS.inc((method, route), stats.statements)
+                for duration in stats.sql_durations:
+                    SQL_DURATION.observe(duration, (method, route))
+            SQL_STATEMENTS_PER_REQUEST.observe(
+                stats.statements, (method, route)
+            )
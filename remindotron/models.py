@@ -17,23 +17,15 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>."""
 
 from datetime import date as DTDate
 from datetime import datetime
-from enum import StrEnum
-from typing import Optional
+from typing import Any, Optional
 
+from sqlalchemy import JSON, ForeignKey, Index
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import ForeignKey
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship
 from sqlalchemy.orm.base import Mapped
 from sqlalchemy.sql import func
 
-
-class Recurring(StrEnum):
-    ONCE = "once"
-    DAILY = "daily"
-    WEEKLY = "weekly"
-    MONTHLY = "monthly"
-    QUARTERLY = "quarterly"
-    YEARLY = "yearly"
+from remindotron.recurrence import Recurring
 
 
 class Base(DeclarativeBase):
@@ -55,6 +47,16 @@ class ReminderCategory(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Daily run lookups and keyset order on (date, id): SQLite appends
+        # the rowid (id) to every index entry
+        Index("ix_reminders_date", "date"),
+        # Reminders of a category, ordered by due date
+        Index("ix_reminders_category_id_date", "category_id", "date"),
+        # Covers the per-schedule GROUP BY of the forecast without reading
+        # the table
+        Index("ix_reminders_recurring_date", "recurring", "date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(nullable=False)
@@ -87,3 +89,93 @@ The reminder for "{self.name}" {self.id} has the following data:
     last occurence: {self.last_occurrence}
     times triggered: {self.occurrence_count}
     created on: {str(self.created)}"""
+
+
+class Occurrence(Base):
+    """Append-only log of every time a reminder fired, written by the run in
+    the same transaction that advances the reminders."""
+
+    __tablename__ = "occurrences"
+    __table_args__ = (
+        Index("ix_occurrences_reminder_id_due", "reminder_id", "due"),
+        # Archival moves the oldest rows out
+        Index("ix_occurrences_fired", "fired"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # No foreign key: the log outlives reminders that are archived or deleted
+    reminder_id: Mapped[int] = mapped_column(nullable=False)
+    due: Mapped[DTDate] = mapped_column(nullable=False)
+    fired: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Occurrence of {self.reminder_id} due {self.due}>"
+
+
+class ArchivedReminder(Base):
+    """Fired ONCE reminders moved out of the reminders table by `archive`,
+    with the same columns plus the time they were archived."""
+
+    __tablename__ = "archived_reminders"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(default=None)
+    date: Mapped[DTDate] = mapped_column(nullable=False)
+    priority: Mapped[Optional[int]] = mapped_column(default=5)
+    recurring: Mapped[Recurring] = mapped_column(SQLAlchemyEnum(Recurring))
+    category_id: Mapped[Optional[int]] = mapped_column(default=None)
+    last_occurrence: Mapped[Optional[datetime]] = mapped_column(default=None)
+    occurrence_count: Mapped[int] = mapped_column(default=0)
+    created: Mapped[datetime] = mapped_column()
+    archived: Mapped[datetime] = mapped_column(default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedReminder {self.name=} for {self.date}>"
+
+
+class ArchivedOccurrence(Base):
+    __tablename__ = "archived_occurrences"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    reminder_id: Mapped[int] = mapped_column(nullable=False)
+    due: Mapped[DTDate] = mapped_column(nullable=False)
+    fired: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedOccurrence of {self.reminder_id} due {self.due}>"
+
+
+class Notification(Base):
+    """Outbox of notifications, written in the same transaction as the run
+    that produced them and drained by the sender."""
+
+    __tablename__ = "outbox"
+    __table_args__ = (Index("ix_outbox_pending", "sent", "next_attempt"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str] = mapped_column(nullable=False)
+    message: Mapped[str] = mapped_column(nullable=False)
+    priority: Mapped[int] = mapped_column(default=5)
+    extras: Mapped[Optional[dict[str, Any]]] = mapped_column(
+        JSON, default=None
+    )
+    created: Mapped[datetime] = mapped_column(default=datetime.now)
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt: Mapped[datetime] = mapped_column(default=datetime.now)
+    sent: Mapped[Optional[datetime]] = mapped_column(default=None)
+    last_error: Mapped[Optional[str]] = mapped_column(default=None)
+
+    def __repr__(self) -> str:
+        return f"<Notification {self.title} ({self.attempts} attempts)>"
+
+
+class DataVersion(Base):
+    """Single-row counter bumped by triggers on every write to reminders and
+    categories, from any process, so readers can tell cheaply whether the
+    data changed since they last looked."""
+
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(default=0)
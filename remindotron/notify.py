@@ -0,0 +1,329 @@
+"""Remindotron - notify.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import asyncio
+import logging
+from datetime import date as DTDate
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Optional
+
+import httpx
+from gotify import AsyncGotify
+from sqlalchemy import Row, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from remindotron.models import Notification
+from remindotron.queries import pending_notifications
+
+logger = logging.getLogger("remindotron.logging")
+
+MARKDOWN_EXTRAS = {"client::display": {"contentType": "text/markdown"}}
+
+
+class DrainReport(NamedTuple):
+    sent: int
+    failed: int
+
+
+class Delivery(NamedTuple):
+    id: int
+    attempts: int
+    error: Optional[str]
+
+
+### DIGESTS ###
+# Gotify's own priority bands, highest first
+PRIORITY_BANDS = (("high", 8), ("normal", 4), ("low", 0))
+DEFAULT_PRIORITY = 5
+DEFAULT_CHUNK_ITEMS = 50
+
+
+class DueReminder(NamedTuple):
+    # One row of queries.due_reminders, the run doesn't load Reminder
+    # objects
+    id: int
+    name: str
+    priority: Optional[int]
+    category: Optional[str]
+
+
+class DigestPolicy(NamedTuple):
+    strategy: str = "single"
+    max_items: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+
+def digest_line(reminder: DueReminder) -> str:
+    if reminder.category:
+        return f"- {reminder.category.capitalize()}: {reminder.name}\n\n"
+    return f"- {reminder.name}\n\n"
+
+
+def priority_band(priority: Optional[int]) -> str:
+    priority = DEFAULT_PRIORITY if priority is None else priority
+    return next(band for band, floor in PRIORITY_BANDS if priority >= floor)
+
+
+def group_key(reminder: DueReminder, strategy: str) -> str:
+    if strategy == "category":
+        if reminder.category:
+            return reminder.category.capitalize()
+        return "Uncategorized"
+    if strategy == "priority":
+        return f"{priority_band(reminder.priority).capitalize()} priority"
+    return ""
+
+
+def group_reminders(
+    reminders: list[DueReminder], strategy: str
+) -> dict[str, list[DueReminder]]:
+    groups: dict[str, list[DueReminder]] = {}
+    for reminder in reminders:
+        groups.setdefault(group_key(reminder, strategy), []).append(reminder)
+    if strategy == "priority":
+        order = [f"{band.capitalize()} priority" for band, _ in PRIORITY_BANDS]
+        return {label: groups[label] for label in order if label in groups}
+    return groups
+
+
+def chunk_lines(
+    lines: list[tuple[DueReminder, str]],
+    header: str,
+    max_items: Optional[int],
+    max_bytes: Optional[int],
+) -> list[list[tuple[DueReminder, str]]]:
+    chunks: list[list[tuple[DueReminder, str]]] = [[]]
+    size = len(header.encode())
+    for reminder, line in lines:
+        line_size = len(line.encode())
+        current = chunks[-1]
+        # A single line over max_bytes still goes out, in a chunk of its own
+        if current and (
+            (max_items and len(current) >= max_items)
+            or (max_bytes and size + line_size > max_bytes)
+        ):
+            current = []
+            chunks.append(current)
+            size = len(header.encode())
+        current.append((reminder, line))
+        size += line_size
+    return chunks
+
+
+def chunk_priority(reminders: list[DueReminder]) -> int:
+    priorities = [
+        reminder.priority
+        for reminder in reminders
+        if reminder.priority is not None
+    ]
+    if not priorities:
+        return DEFAULT_PRIORITY
+    return int(sum(priorities) / len(priorities))
+
+
+def build_digests(
+    reminders: list[DueReminder],
+    today: DTDate,
+    policy: Optional[DigestPolicy] = None,
+) -> list[Notification]:
+    """Split the due reminders into one or more notifications.
+
+    The strategy groups the reminders (single, category or priority band),
+    every group is then cut into chunks of at most max_items lines and
+    max_bytes of message. The chunked strategy is a single group with a
+    default of DEFAULT_CHUNK_ITEMS items per chunk."""
+    policy = policy or DigestPolicy()
+    max_items = policy.max_items
+    if policy.strategy == "chunked" and not (max_items or policy.max_bytes):
+        max_items = DEFAULT_CHUNK_ITEMS
+
+    header = f"**{today.strftime('%d-%m-%Y')}**\n\n"
+    notifications = []
+    for label, group in group_reminders(reminders, policy.strategy).items():
+        chunks = chunk_lines(
+            [(reminder, digest_line(reminder)) for reminder in group],
+            header,
+            max_items,
+            policy.max_bytes,
+        )
+        for index, chunk in enumerate(chunks, 1):
+            title = "Reminders for today"
+            if label:
+                title += f": {label}"
+            if len(chunks) > 1:
+                title += f" ({index}/{len(chunks)})"
+            notifications.append(
+                Notification(
+                    title=title,
+                    message=header + "".join(line for _, line in chunk),
+                    priority=chunk_priority(
+                        [reminder for reminder, _ in chunk]
+                    ),
+                    extras=MARKDOWN_EXTRAS,
+                )
+            )
+    return notifications
+
+
+### OUTBOX ###
+def enqueue_notifications(
+    db: Session, notifications: list[Notification]
+) -> None:
+    # Called inside the transaction that advances the reminders, so either
+    # both the new dates and the notifications are stored or neither is
+    db.add_all(notifications)
+
+
+def backoff(attempts: int, base_delay: float, max_delay: float) -> float:
+    return min(base_delay * 2 ** max(attempts - 1, 0), max_delay)
+
+
+### SENDER ###
+async def deliver(
+    gotify: AsyncGotify,
+    semaphore: asyncio.Semaphore,
+    notification: Row[Any],
+    retries: int,
+    base_delay: float,
+) -> Delivery:
+    attempts = notification.attempts
+    error = None
+    for retry in range(retries):
+        attempts += 1
+        try:
+            async with semaphore:
+                await gotify.create_message(
+                    message=notification.message,
+                    title=notification.title,
+                    priority=notification.priority,
+                    extras=notification.extras,
+                )
+            return Delivery(notification.id, attempts, None)
+        except Exception as e:
+            # gotify raises GotifyError for error responses and httpx errors
+            # for connection problems, both are retried
+            error = f"{type(e).__name__}: {e}"
+            logger.warning(
+                f"Sending notification {notification.id} failed: {error}"
+            )
+            if retry + 1 < retries:
+                await asyncio.sleep(backoff(retry + 1, base_delay, 60))
+    return Delivery(notification.id, attempts, error)
+
+
+def record_deliveries(
+    db: Session,
+    deliveries: list[Delivery],
+    base_delay: float,
+    max_delay: float,
+) -> None:
+    now = datetime.now()
+    for delivery in deliveries:
+        values: dict[str, Any] = {
+            "attempts": delivery.attempts,
+            "last_error": delivery.error,
+        }
+        if delivery.error is None:
+            values["sent"] = now
+        else:
+            values["next_attempt"] = now + timedelta(
+                seconds=backoff(delivery.attempts, base_delay, max_delay)
+            )
+        db.execute(
+            update(Notification)
+            .where(Notification.id == delivery.id)
+            .values(**values)
+        )
+
+
+async def drain(
+    session_factory: sessionmaker[Session],
+    base_url: str,
+    app_token: str,
+    concurrency: int,
+    retries: int,
+    max_attempts: int,
+    base_delay: float,
+    max_delay: float,
+) -> DrainReport:
+    sent = failed = 0
+    # One client for the whole drain: the connection to Gotify is kept alive
+    # and reused, and never more than `concurrency` requests are in flight
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(limits=limits, timeout=10) as http_client:
+        gotify = AsyncGotify(base_url=base_url, app_token=app_token)
+        gotify.http_client = http_client
+        semaphore = asyncio.Semaphore(concurrency)
+        seen: set[int] = set()
+        while True:
+            with session_factory() as db:
+                batch = [
+                    row
+                    for row in db.execute(
+                        pending_notifications(
+                            datetime.now(), max_attempts, concurrency * 4
+                        )
+                    )
+                    if row.id not in seen
+                ]
+            if not batch:
+                break
+            seen.update(row.id for row in batch)
+            deliveries = await asyncio.gather(
+                *(
+                    deliver(gotify, semaphore, row, retries, base_delay)
+                    for row in batch
+                )
+            )
+            with session_factory() as db, db.begin():
+                record_deliveries(db, deliveries, base_delay, max_delay)
+            sent += sum(delivery.error is None for delivery in deliveries)
+            failed += sum(
+                delivery.error is not None for delivery in deliveries
+            )
+    return DrainReport(sent, failed)
+
+
+def drain_outbox(
+    session_factory: sessionmaker[Session],
+    base_url: str,
+    app_token: str,
+    concurrency: int = 4,
+    retries: int = 3,
+    max_attempts: int = 10,
+    base_delay: float = 1,
+    max_delay: float = 3600,
+) -> DrainReport:
+    """Send every pending notification at least once.
+
+    A notification is only marked as sent after Gotify accepted it. Failed
+    sends are retried with exponential backoff, first within this drain and
+    afterwards on later drains, until max_attempts is reached."""
+    return asyncio.run(
+        drain(
+            session_factory,
+            base_url,
+            app_token,
+            concurrency,
+            retries,
+            max_attempts,
+            base_delay,
+            max_delay,
+        )
+    )
@@ -0,0 +1,75 @@
+"""Remindotron - profiling.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+
+class PhaseProfiler:
+    """Wall-clock time per named phase of a CLI command.
+
+    Disabled by default, so the phase() blocks in the daily job cost next
+    to nothing unless --profile is given. A phase entered more than once
+    (e.g. per database) accumulates its time and counts the calls."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = perf_counter()
+        self.phases: dict[str, list[float]] = {}
+
+    def start(self) -> None:
+        # This module is imported at the top of the CLI, so the time since
+        # it was created is (close to) the import of the CLI module itself
+        self.enabled = True
+        self.phases = {"cli import": [perf_counter() - self.started, 1]}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += perf_counter() - start
+            totals[1] += 1
+
+    def report(self, command: str) -> dict[str, Any]:
+        return {
+            "command": command,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "total_seconds": round(perf_counter() - self.started, 6),
+            "phases": {
+                name: {"seconds": round(seconds, 6), "calls": int(calls)}
+                for name, (seconds, calls) in self.phases.items()
+            },
+        }
+
+    def write(self, path: Path, command: str) -> dict[str, Any]:
+        report = self.report(command)
+        path.write_text(json.dumps(report, indent=2) + "\n")
+        return report
+
+
+profiler = PhaseProfiler()
@@ -0,0 +1,541 @@
+"""Remindotron - queries.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+import re
+from datetime import date as DTDate
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import (
+    ClauseElement,
+    ColumnClause,
+    ColumnElement,
+    Delete,
+    Insert,
+    Select,
+    Update,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+)
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import QueryableAttribute, aliased, joinedload
+
+from remindotron.database import SEARCH_TABLE
+from remindotron.models import (
+    ArchivedOccurrence,
+    ArchivedReminder,
+    Notification,
+    Occurrence,
+    Recurring,
+    Reminder,
+    ReminderCategory,
+)
+
+# The columns of a reminder as served by the API, in the field order of
+# ReminderOut, with the category name joined in. Read paths select these
+# into plain rows instead of loading Reminder objects, which skips the
+# identity map and attribute instrumentation per row.
+REMINDER_COLUMNS = (
+    Reminder.name,
+    Reminder.description,
+    Reminder.date,
+    Reminder.priority,
+    Reminder.recurring,
+    ReminderCategory.name.label("category"),
+    Reminder.id,
+    Reminder.last_occurrence,
+    Reminder.occurrence_count,
+    Reminder.created,
+)
+
+
+def not_fired_once() -> ColumnElement[bool]:
+    # A ONCE reminder that fired never fires again, also not when the same
+    # day is run twice (the daemon does when a reminder for today is added)
+    return or_(
+        Reminder.recurring != Recurring.ONCE,
+        Reminder.occurrence_count == 0,
+    )
+
+
+def due_filter(today: DTDate, catch_up: bool = False) -> ColumnElement[bool]:
+    # With catch-up, overdue reminders fire once more
+    return and_(
+        Reminder.date == today if not catch_up else Reminder.date <= today,
+        not_fired_once(),
+    )
+
+
+def due_reminders(today: DTDate, catch_up: bool = False) -> Select[Any]:
+    # Only what the digests need, see notify.DueReminder
+    return (
+        select(
+            Reminder.id,
+            Reminder.name,
+            Reminder.priority,
+            ReminderCategory.name.label("category"),
+        )
+        .outerjoin(Reminder.category)
+        .where(due_filter(today, catch_up))
+    )
+
+
+def due_reminder_items(today: DTDate) -> Select[Any]:
+    return (
+        select(*REMINDER_COLUMNS)
+        .outerjoin(Reminder.category)
+        .where(due_filter(today))
+        .order_by(Reminder.id)
+    )
+
+
+def reminder_items(ids: list[int]) -> Select[Any]:
+    return (
+        select(*REMINDER_COLUMNS)
+        .outerjoin(Reminder.category)
+        .where(Reminder.id.in_(ids))
+        .order_by(Reminder.id)
+    )
+
+
+def due_groups(today: DTDate, catch_up: bool = False) -> Select[Any]:
+    return (
+        select(Reminder.recurring, Reminder.date)
+        .where(due_filter(today, catch_up))
+        .distinct()
+    )
+
+
+def group_filter(
+    today: DTDate, catch_up: bool, recurring: Recurring, current: DTDate
+) -> ColumnElement[bool]:
+    return and_(
+        due_filter(today, catch_up),
+        Reminder.recurring == recurring,
+        Reminder.date == current,
+    )
+
+
+def log_group(
+    today: DTDate,
+    catch_up: bool,
+    recurring: Recurring,
+    current: DTDate,
+    fired: datetime,
+) -> Insert:
+    # INSERT ... SELECT, so the log of a group is written by SQLite without
+    # the reminders passing through Python
+    return insert(Occurrence).from_select(
+        ["reminder_id", "due", "fired"],
+        select(Reminder.id, literal(current), literal(fired)).where(
+            group_filter(today, catch_up, recurring, current)
+        ),
+    )
+
+
+def advance_group(
+    today: DTDate,
+    catch_up: bool,
+    recurring: Recurring,
+    current: DTDate,
+    values: dict[str, Any],
+) -> Update:
+    return (
+        sql_update(Reminder)
+        .where(group_filter(today, catch_up, recurring, current))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def category_by_name(name: str) -> Select[Any]:
+    return select(ReminderCategory).where(ReminderCategory.name == name)
+
+
+def reminders_by_category(category_id: int) -> Select[Any]:
+    return (
+        select(Reminder)
+        .where(Reminder.category_id == category_id)
+        .order_by(Reminder.date, Reminder.id)
+    )
+
+
+def category_summaries(today: DTDate) -> Select[Any]:
+    # Counts and the next due date of every category in one grouped scan,
+    # instead of loading every reminder to count them in Python
+    return (
+        select(
+            ReminderCategory.name,
+            ReminderCategory.id,
+            func.count(Reminder.id).label("reminder_count"),
+            func.min(case((Reminder.date >= today, Reminder.date))).label(
+                "next_due"
+            ),
+        )
+        .outerjoin(Reminder, Reminder.category_id == ReminderCategory.id)
+        .group_by(ReminderCategory.id)
+        .order_by(ReminderCategory.id)
+    )
+
+
+def categories_with_reminders(per_category: int) -> Select[Any]:
+    # The first reminders of every category by due date: per category the
+    # correlated subquery reads at most `per_category` ids from
+    # ix_reminders_category_id_date, and only those rows are fetched. The
+    # category names come from the summaries.
+    first = aliased(Reminder)
+    capped = (
+        select(first.id)
+        .where(first.category_id == ReminderCategory.id)
+        .order_by(first.date, first.id)
+        .limit(per_category)
+    )
+    return (
+        select(
+            *(
+                column
+                for column in REMINDER_COLUMNS
+                if column.key != "category"
+            ),
+            Reminder.category_id,
+        )
+        .select_from(ReminderCategory)
+        .join(Reminder, Reminder.id.in_(capped))
+        .order_by(ReminderCategory.id, Reminder.date, Reminder.id)
+    )
+
+
+def reminders_page(
+    limit: int,
+    after: Optional[tuple[DTDate, int]] = None,
+    date_from: Optional[DTDate] = None,
+    date_to: Optional[DTDate] = None,
+    category: Optional[str] = None,
+    priority_min: Optional[int] = None,
+    recurring: Optional[Recurring] = None,
+) -> Select[Any]:
+    # Keyset pagination on (date, id), which ix_reminders_date (or the
+    # category index when filtering on a category) already returns in order.
+    # One extra row is fetched to find out whether there is a next page.
+    stmt = (
+        select(*REMINDER_COLUMNS)
+        .outerjoin(Reminder.category)
+        .order_by(Reminder.date, Reminder.id)
+        .limit(limit + 1)
+    )
+    if after:
+        after_date, after_id = after
+        stmt = stmt.where(
+            tuple_(Reminder.date, Reminder.id)
+            > tuple_(literal(after_date), literal(after_id))
+        )
+    if date_from:
+        stmt = stmt.where(Reminder.date >= date_from)
+    if date_to:
+        stmt = stmt.where(Reminder.date <= date_to)
+    if category:
+        stmt = stmt.where(
+            Reminder.category_id
+            == select(ReminderCategory.id)
+            .where(ReminderCategory.name == category)
+            .scalar_subquery()
+        )
+    if priority_min is not None:
+        stmt = stmt.where(Reminder.priority >= priority_min)
+    if recurring:
+        stmt = stmt.where(Reminder.recurring == recurring)
+    return stmt
+
+
+# Orderings offered by `show`, each ending in the id so pages are stable
+SHOW_SORTS: dict[str, tuple[Any, ...]] = {
+    "id": (Reminder.id,),
+    "date": (Reminder.date, Reminder.id),
+    "name": (Reminder.name, Reminder.id),
+    "priority": (Reminder.priority.desc(), Reminder.date, Reminder.id),
+    "created": (Reminder.created, Reminder.id),
+}
+
+
+def show_rows(
+    sort: str,
+    batch_size: int,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    date_from: Optional[DTDate] = None,
+    date_to: Optional[DTDate] = None,
+    category: Optional[str] = None,
+) -> Select[Any]:
+    # Flat rows with the category name, filtered, ordered and paged by
+    # SQLite and streamed `batch_size` rows at a time
+    stmt = (
+        select(
+            Reminder.id,
+            Reminder.name,
+            Reminder.description,
+            ReminderCategory.name.label("category"),
+            Reminder.date,
+            Reminder.priority,
+            Reminder.recurring,
+            Reminder.last_occurrence,
+            Reminder.occurrence_count,
+            Reminder.created,
+        )
+        .outerjoin(Reminder.category)
+        .order_by(*SHOW_SORTS[sort])
+        .limit(limit)
+        .offset(offset or None)
+        .execution_options(yield_per=batch_size)
+    )
+    if date_from:
+        stmt = stmt.where(Reminder.date >= date_from)
+    if date_to:
+        stmt = stmt.where(Reminder.date <= date_to)
+    if category:
+        stmt = stmt.where(ReminderCategory.name == category)
+    return stmt
+
+
+SEARCH_TOKEN = re.compile(r"\w+")
+# bm25 weights of the name, description and category columns
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+def search_expression(text: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word is quoted, so
+    operators and syntax in the input are searched for literally, and the
+    last word matches as a prefix for search-as-you-type."""
+    tokens = SEARCH_TOKEN.findall(text)
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_reminders(expression: str, limit: int, offset: int) -> Select[Any]:
+    index: ColumnClause[Any] = literal_column(SEARCH_TABLE)
+    rank = func.bm25(index, *SEARCH_WEIGHTS)
+    # Rank inside the FTS table first, then load only the page of
+    # reminders; one row more than the page tells whether there is a next
+    matches = (
+        select(literal_column("rowid").label("id"), rank.label("rank"))
+        .select_from(table(SEARCH_TABLE))
+        .where(index.op("MATCH")(expression))
+        .order_by(rank)
+        .limit(limit + 1)
+        .offset(offset)
+        .subquery()
+    )
+    return (
+        select(*REMINDER_COLUMNS)
+        .join(matches, Reminder.id == matches.c.id)
+        .outerjoin(Reminder.category)
+        .order_by(matches.c.rank, Reminder.id)
+    )
+
+
+def export_categories(batch_size: int) -> Select[Any]:
+    return (
+        select(ReminderCategory)
+        .order_by(ReminderCategory.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def export_reminders(batch_size: int) -> Select[Any]:
+    return (
+        select(Reminder)
+        .options(joinedload(Reminder.category))
+        .order_by(Reminder.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def export_rows(batch_size: int) -> Select[Any]:
+    # Flat rows in the CSV/JSON Lines import format, without ORM objects
+    return (
+        select(
+            Reminder.name,
+            Reminder.description,
+            Reminder.date,
+            Reminder.priority,
+            Reminder.recurring,
+            ReminderCategory.name.label("category"),
+            Reminder.last_occurrence,
+            Reminder.occurrence_count,
+        )
+        .outerjoin(Reminder.category)
+        .order_by(Reminder.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def occurrence_groups(start: DTDate, end: DTDate) -> Select[Any]:
+    # Reminders sharing a recurrence and due date have the same future
+    # occurrences, so the forecast only expands one row per schedule
+    return (
+        select(Reminder.recurring, Reminder.date, func.count())
+        .where(Reminder.date <= end, not_fired_once())
+        .where(
+            or_(Reminder.recurring != Recurring.ONCE, Reminder.date >= start)
+        )
+        .group_by(Reminder.recurring, Reminder.date)
+    )
+
+
+def fire_dates() -> Select[Any]:
+    # Every date that still fires, ONCE reminders that fired are done
+    return select(Reminder.date).where(not_fired_once()).distinct()
+
+
+def pending_notifications(
+    now: datetime, max_attempts: int, limit: int
+) -> Select[Any]:
+    return (
+        select(
+            Notification.id,
+            Notification.title,
+            Notification.message,
+            Notification.priority,
+            Notification.extras,
+            Notification.attempts,
+        )
+        .where(
+            Notification.sent.is_(None),
+            Notification.next_attempt <= now,
+            Notification.attempts < max_attempts,
+        )
+        .order_by(Notification.next_attempt)
+        .limit(limit)
+    )
+
+
+def finished_filter(before: DTDate) -> ColumnElement[bool]:
+    # ONCE reminders that fired and were due before `before`, they never
+    # fire again
+    return and_(
+        Reminder.recurring == Recurring.ONCE,
+        Reminder.date < before,
+        Reminder.occurrence_count > 0,
+    )
+
+
+def batch_end(
+    id_column: QueryableAttribute[int],
+    condition: ColumnElement[bool],
+    size: int,
+) -> Select[Any]:
+    # The highest id of the next `size` matching rows. Moving the matching
+    # rows up to that id keeps a batch bounded without binding every id as
+    # a parameter.
+    batch = (
+        select(id_column).where(condition).order_by(id_column).limit(size)
+    ).subquery()
+    return select(func.max(batch.c[0]))
+
+
+def archive_reminders(before: DTDate, up_to_id: int) -> Insert:
+    columns = [
+        column.key
+        for column in ArchivedReminder.__table__.columns
+        if column.key != "archived"
+    ]
+    return insert(ArchivedReminder).from_select(
+        [*columns, "archived"],
+        select(
+            *(getattr(Reminder, column) for column in columns),
+            literal(datetime.now()),
+        ).where(finished_filter(before), Reminder.id <= up_to_id),
+    )
+
+
+def delete_finished_reminders(before: DTDate, up_to_id: int) -> Delete:
+    return delete(Reminder).where(
+        finished_filter(before), Reminder.id <= up_to_id
+    )
+
+
+def archive_occurrences(before: datetime, up_to_id: int) -> Insert:
+    columns = [column.key for column in ArchivedOccurrence.__table__.columns]
+    return insert(ArchivedOccurrence).from_select(
+        columns,
+        select(*(getattr(Occurrence, column) for column in columns)).where(
+            Occurrence.fired < before, Occurrence.id <= up_to_id
+        ),
+    )
+
+
+def delete_old_occurrences(before: datetime, up_to_id: int) -> Delete:
+    return delete(Occurrence).where(
+        Occurrence.fired < before, Occurrence.id <= up_to_id
+    )
+
+
+def builtin_queries(today: DTDate) -> dict[str, ClauseElement]:
+    # Representative statements for every hot lookup, used by `explain`
+    return {
+        "due reminders": due_reminders(today),
+        "due reminders (catch-up)": due_reminders(today, catch_up=True),
+        "due groups (catch-up)": due_groups(today, catch_up=True),
+        "due reminder items": due_reminder_items(today),
+        "advance due group": advance_group(
+            today,
+            False,
+            Recurring.YEARLY,
+            today,
+            {"occurrence_count": Reminder.occurrence_count + 1},
+        ),
+        "log due group": log_group(
+            today, False, Recurring.YEARLY, today, datetime.now()
+        ),
+        "finished reminders batch": batch_end(
+            Reminder.id, finished_filter(today), 1000
+        ),
+        "old occurrences batch": batch_end(
+            Occurrence.id,
+            Occurrence.fired < datetime.combine(today, datetime.min.time()),
+            1000,
+        ),
+        "category by name": category_by_name("example"),
+        "reminders by category": reminders_by_category(1),
+        "category summaries": category_summaries(today),
+        "categories with reminders": categories_with_reminders(5),
+        "fire dates": fire_dates(),
+        "forecast groups": occurrence_groups(today, today + timedelta(90)),
+        "pending notifications": pending_notifications(
+            datetime.combine(today, datetime.min.time()), 8, 100
+        ),
+        "search reminders": search_reminders('"example"*', 20, 0),
+        "show due within a week": show_rows(
+            "date", 1000, 100, date_from=today, date_to=today + timedelta(7)
+        ),
+        "show by category": show_rows("date", 1000, 100, category="example"),
+        "reminders page": reminders_page(100, after=(today, 1)),
+        "reminders page by category": reminders_page(
+            100, after=(today, 1), category="example"
+        ),
+    }
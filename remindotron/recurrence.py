@@ -0,0 +1,122 @@
+"""Remindotron - recurrence.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+from collections.abc import Iterable
+from datetime import date as DTDate
+from datetime import timedelta
+from enum import StrEnum
+
+
+class Recurring(StrEnum):
+    ONCE = "once"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    QUARTERLY = "quarterly"
+    YEARLY = "yearly"
+
+
+# Length of one period, in days for fixed-length recurrences and in months
+# for calendar-based ones. Only the calendar-based ones need dateutil, which
+# is imported where it's used: the CLI imports Recurring at startup.
+PERIOD_DAYS = {Recurring.DAILY: 1, Recurring.WEEKLY: 7}
+PERIOD_MONTHS = {
+    Recurring.MONTHLY: 1,
+    Recurring.QUARTERLY: 3,
+    Recurring.YEARLY: 12,
+}
+
+
+def next_occurrence(
+    current: DTDate, recurring: Recurring, today: DTDate
+) -> DTDate:
+    """Return the first occurrence after `today`, at least one period after
+    `current`. Elapsed periods are counted arithmetically, so a reminder that
+    is years behind costs the same as one that is due today."""
+    if recurring == Recurring.ONCE:
+        return current
+
+    if recurring in PERIOD_DAYS:
+        step = PERIOD_DAYS[recurring]
+        periods = max((today - current).days // step + 1, 1)
+        return current + timedelta(days=periods * step)
+
+    if recurring in PERIOD_MONTHS:
+        from dateutil.relativedelta import relativedelta
+
+        step = PERIOD_MONTHS[recurring]
+        elapsed = (
+            (today.year - current.year) * 12 + today.month - current.month
+        )
+        periods = max(elapsed // step, 1)
+        candidate = current + relativedelta(months=periods * step)
+        if candidate <= today:
+            # Same month as today, but the day of month has already passed
+            candidate = current + relativedelta(months=(periods + 1) * step)
+        return candidate
+
+    raise ValueError("item.recurring not found in Enum")
+
+
+def occurrences(
+    first: DTDate, recurring: Recurring, start: DTDate, end: DTDate
+) -> Iterable[DTDate]:
+    """Yield the occurrences in [start, end] of a reminder due on `first`,
+    assuming every occurrence fires on time and is advanced by the run."""
+    if recurring == Recurring.ONCE:
+        if start <= first <= end:
+            yield first
+        return
+
+    if recurring in PERIOD_DAYS:
+        step = PERIOD_DAYS[recurring]
+        # Jump straight to the first occurrence on or after start
+        skipped = max(-(-(start - first).days // step), 0)
+        current = first + timedelta(days=skipped * step)
+        while current <= end:
+            yield current
+            current += timedelta(days=step)
+        return
+
+    from dateutil.relativedelta import relativedelta
+
+    # Month-based dates are advanced one period at a time, like the run
+    # does, so a 31st that was clamped to the 28th stays on the 28th
+    delta = relativedelta(months=PERIOD_MONTHS[recurring])
+    current = first
+    while current <= end:
+        if current >= start:
+            yield current
+        current = current + delta
+
+
+def forecast(
+    groups: Iterable[tuple[Recurring, DTDate, int]],
+    start: DTDate,
+    end: DTDate,
+) -> dict[DTDate, dict[Recurring, int]]:
+    """Count the occurrences per day and recurrence between start and end.
+
+    `groups` holds the number of reminders per (recurrence, due date), so
+    the work depends on the number of distinct schedules rather than the
+    number of reminders."""
+    days: dict[DTDate, dict[Recurring, int]] = {}
+    for recurring, first, count in groups:
+        for day in occurrences(first, recurring, start, end):
+            per_recurring = days.setdefault(day, {})
+            per_recurring[recurring] = per_recurring.get(recurring, 0) + count
+    return dict(sorted(days.items()))
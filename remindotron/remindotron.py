@@ -19,55 +19,79 @@ import argparse
 import logging
 import os
 import subprocess
+import sys
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, nullcontext
 from datetime import date as DTDate
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
-from gotify import Gotify
-from rich.console import Console
-from rich.prompt import Confirm, Prompt
-from rich.table import Table
-from rich.text import Text
-from sqlalchemy import create_engine
-from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import (
-    joinedload,
-    sessionmaker,
-)
 
-from remindotron import __version__
 from remindotron.logging import get_logger
-from remindotron.models import Base, Recurring, Reminder, ReminderCategory
+from remindotron.profiling import profiler
+from remindotron.recurrence import Recurring
+
+# Heavy dependencies are imported in the functions that use them, so every
+# subcommand (and --version) only pays for what it needs at startup
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.progress import Progress
+    from sqlalchemy import Engine
+    from sqlalchemy.orm import Session as DBSession
+
+    from remindotron.notify import DigestPolicy
 
 ### GLOBAL SETUP ###
 load_dotenv(".env")
 GOTIFY_URL = os.getenv("GOTIFY_URL")
 GOTIFY_APP_TOKEN = os.getenv("GOTIFY_APP_TOKEN")
 DATABASE_LOCATION = os.getenv("DATABASE_LOCATION")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE")
+DATABASE_PRAGMAS = os.getenv("DATABASE_PRAGMAS")
+BULK_FORMATS = ("csv", "jsonl")
+SHOW_FORMATS = ("table", "csv", "json")
+# The --sort choices, kept here so the parser doesn't import the queries at
+# startup; tests check they match the columns in remindotron.queries
+SHOW_SORTS = ("id", "date", "name", "priority", "created")
+# Rows fetched from SQLite per step by `show`, and rows per table write
+SHOW_CHUNK_SIZE = 1000
+SHOW_TABLE_ROWS = 100
+DIGEST_STRATEGIES = ("single", "category", "priority", "chunked")
+# Set up by run_command (and by every fleet worker) once the database is known
+engine: "Engine"
 
-
-console = Console()
 logger = get_logger()
 logging.getLogger("httpx").setLevel(logging.INFO)
 logging.getLogger("httpcore").setLevel(logging.INFO)
 
 
+@cache
+def get_console() -> "Console":
+    from rich.console import Console
+
+    return Console()
+
+
 ### MAIN FUNCTIONS ###
 def insert_reminder(**kwargs: Any) -> None:
+    from rich.prompt import Confirm
+    from sqlalchemy.exc import NoResultFound
+
+    from remindotron.models import Reminder, ReminderCategory
+    from remindotron.queries import category_by_name
+
     category_result = None
 
     if kwargs["type"]:
         category_name = kwargs["type"]
         with Session() as db:
             try:
-                category_result = (
-                    db.query(ReminderCategory)
-                    .where(ReminderCategory.name == category_name)
-                    .one()
-                )
+                category_result = db.scalars(
+                    category_by_name(category_name)
+                ).one()
                 logger.debug(f"Found category {category_name} already in db")
             except NoResultFound:
                 logger.info(f"Category {category_name} not in db")
@@ -106,139 +130,827 @@ def insert_reminder(**kwargs: Any) -> None:
         raise SystemExit(1) from e
 
 
+SHOW_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "category",
+    "date",
+    "priority",
+    "recurring",
+    "last_occurrence",
+    "occurrence_count",
+    "created",
+)
+
+
+# Header, preferred and minimum width, and alignment of the table columns
+# of `show`; the minimums fit an 80 column terminal
+SHOW_TABLE_COLUMNS = (
+    ("id", 6, 6, "right"),
+    ("name", 24, 10, "left"),
+    ("description", 15, 1, "left"),
+    ("category", 14, 4, "left"),
+    ("date", 10, 10, "left"),
+    ("priority", 8, 3, "right"),
+    ("recurring", 9, 4, "left"),
+    ("last occurrence", 16, 4, "left"),
+    ("times triggered", 15, 3, "right"),
+    ("created on", 16, 4, "left"),
+)
+
+
+def table_widths(width: int) -> list[int]:
+    # Shrink the widest column that can still shrink until the table fits
+    # the console: every cell has a border and a space of padding on
+    # either side
+    widths = [preferred for _, preferred, _, _ in SHOW_TABLE_COLUMNS]
+    minimums = [minimum for _, _, minimum, _ in SHOW_TABLE_COLUMNS]
+    available = width - 3 * len(widths) - 1
+    while sum(widths) > available:
+        shrinkable = [
+            (current, index)
+            for index, (current, minimum) in enumerate(zip(widths, minimums))
+            if current > minimum
+        ]
+        if not shrinkable:
+            break
+        widths[max(shrinkable)[1]] -= 1
+    return widths
+
+
+def table_line(cells: Iterable[str], widths: list[int], edge: str) -> str:
+    from rich.cells import cell_len, set_cell_size
+
+    fitted = []
+    for text, width, (_, _, _, justify) in zip(
+        cells, widths, SHOW_TABLE_COLUMNS
+    ):
+        text = " ".join(text.split())
+        if cell_len(text) > width:
+            text = set_cell_size(text, width - 1) + "…"
+        padding = " " * (width - cell_len(text))
+        fitted.append(padding + text if justify == "right" else text + padding)
+    return f"{edge} " + f" {edge} ".join(fitted) + f" {edge}"
+
+
+def table_border(
+    widths: list[int], left: str, fill: str, middle: str, right: str
+) -> str:
+    return left + middle.join(fill * (width + 2) for width in widths) + right
+
+
+def show_cells(row: Any) -> tuple[str, ...]:
+    return (
+        str(row.id),
+        row.name,
+        row.description or "",
+        row.category or "",
+        str(row.date),
+        str(row.priority),
+        str(row.recurring),
+        f"{row.last_occurrence:%Y-%m-%d %H:%M}" if row.last_occurrence else "",
+        str(row.occurrence_count),
+        f"{row.created:%Y-%m-%d %H:%M}",
+    )
+
+
+def show_table(
+    console: "Console", chunks: Iterable[list[Any]], title: str
+) -> int:
+    """Print the rows as a table in the style of rich's, returning the
+    number of rows shown.
+
+    A rich Table measures every cell of a chunk to lay it out, which costs
+    more than the whole query, so the columns get their widths once and
+    each row is formatted as a line of fixed-width cells."""
+    widths = table_widths(console.width)
+    shown = 0
+    for rows in chunks:
+        if not shown:
+            console.out(
+                f"{title:^{sum(widths) + 3 * len(widths) + 1}}",
+                style="table.title",
+                highlight=False,
+            )
+            console.out(
+                table_border(widths, "┏", "━", "┳", "┓"), highlight=False
+            )
+            console.out(
+                table_line(
+                    (header for header, _, _, _ in SHOW_TABLE_COLUMNS),
+                    widths,
+                    "┃",
+                ),
+                style="table.header",
+                highlight=False,
+            )
+            console.out(
+                table_border(widths, "┡", "━", "╇", "┩"), highlight=False
+            )
+        console.out(
+            "\n".join(
+                table_line(show_cells(row), widths, "│") for row in rows
+            ),
+            highlight=False,
+        )
+        shown += len(rows)
+    if shown:
+        console.out(table_border(widths, "└", "─", "┴", "┘"), highlight=False)
+    return shown
+
+
+@contextmanager
+def pager_console() -> Iterator["Console"]:
+    """Console writing to $PAGER (default `less`) when stdout is a terminal,
+    so a long table can be read while it's still being rendered."""
+    import shlex
+
+    from rich.console import Console
+
+    console = get_console()
+    if not sys.stdout.isatty():
+        yield console
+        return
+    command = shlex.split(os.environ.get("PAGER") or "less -FRX")
+    try:
+        pager = subprocess.Popen(
+            command, stdin=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+    except OSError:
+        yield console
+        return
+    assert pager.stdin is not None
+    try:
+        yield Console(
+            file=pager.stdin,
+            force_terminal=True,
+            width=console.width,
+        )
+        pager.stdin.close()
+    except BrokenPipeError:
+        # The pager was closed before the end of the listing
+        pass
+    finally:
+        pager.wait()
+
+
 def show_all(**kwargs: Any) -> None:
+    import csv
+    import json
+
+    from remindotron import queries
+
+    for option in ("limit", "offset", "due_within"):
+        if kwargs[option] is not None and kwargs[option] < 0:
+            logger.error(f"--{option.replace('_', '-')} can't be negative")
+            raise SystemExit(1)
+    date_from = date_to = None
+    if kwargs["due_within"] is not None:
+        date_from = datetime.now().date()
+        date_to = date_from + timedelta(days=kwargs["due_within"])
+    stmt = queries.show_rows(
+        kwargs["sort"],
+        SHOW_CHUNK_SIZE,
+        kwargs["limit"],
+        kwargs["offset"],
+        date_from,
+        date_to,
+        kwargs["category"],
+    )
+
+    shown = 0
     try:
         with Session() as db:
-            result = db.query(Reminder).all()
+            result = db.execute(stmt)
+            if kwargs["format"] == "table":
+                # Hand the pager a screenful or two at a time
+                with pager_console() as console:
+                    shown = show_table(
+                        console,
+                        result.partitions(SHOW_TABLE_ROWS),
+                        "Reminders",
+                    )
+            elif kwargs["format"] == "csv":
+                writer = csv.writer(sys.stdout)
+                writer.writerow(SHOW_COLUMNS)
+                for rows in result.partitions():
+                    writer.writerows(rows)
+                    shown += len(rows)
+            else:
+                for rows in result.partitions():
+                    for row in rows:
+                        sys.stdout.write(
+                            json.dumps(row._asdict(), default=str) + "\n"
+                        )
+                    shown += len(rows)
+    except BrokenPipeError:
+        # Piped into e.g. head, which exited early; point stdout at devnull
+        # so the flush at exit doesn't raise again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
     except Exception as e:
         logger.error(f"Error querying database: {e}")
         raise SystemExit(1) from e
 
-    if not result:
+    if not shown and kwargs["format"] == "table":
         logger.error("No results found to show")
         raise SystemExit(1)
 
-    table = Table(title="Reminders")
-    table.add_column("name")
-    table.add_column("description", max_width=15)
-    table.add_column("date")
-    table.add_column("priority")
-    table.add_column("recurring")
-    table.add_column("last occurrence")
-    table.add_column("times triggered")
-    table.add_column("created on")
-
-    for item in result:
-        table.add_row(
-            item.name,
-            item.description,
-            str(item.date),
-            str(item.priority),
-            str(item.recurring),
-            str(item.last_occurrence),
-            str(item.occurrence_count),
-            str(item.created),
-        )
-    console.print(table)
 
+def drain_notifications(concurrency: int = 4, required: bool = True) -> None:
+    from remindotron.notify import drain_outbox
 
-def send_gotify_notification(reminders: list[Reminder]) -> None:
     if not GOTIFY_URL or not GOTIFY_APP_TOKEN:
+        if not required:
+            return
         logger.error("No valid Gotify credentials available")
+        logger.error(
+            "Notifications are kept in the outbox until the next send"
+        )
         logger.debug(f"{GOTIFY_URL=}; {GOTIFY_APP_TOKEN}")
         raise SystemExit(1)
-    gotify = Gotify(base_url=GOTIFY_URL, app_token=GOTIFY_APP_TOKEN)
-    message = f"**{str(datetime.now().strftime('%d-%m-%Y'))}**\n\n"
-    priority_calc = []
-    for reminder in reminders:
-        if reminder.category:
-            message += (
-                f"- {reminder.category.name.capitalize()}: {reminder.name}\n\n"
-            )
-            priority_calc.append(reminder.priority)
 
-    extras = {"client::display": {"contentType": "text/markdown"}}
+    with profiler.phase("notification send"):
+        report = drain_outbox(
+            Session, GOTIFY_URL, GOTIFY_APP_TOKEN, concurrency=concurrency
+        )
+    if report.sent:
+        logger.info(f"Sent {report.sent} notifications through Gotify")
+    if report.failed:
+        logger.error(
+            f"{report.failed} notifications could not be sent and stay in "
+            "the outbox"
+        )
+    if report.failed:
+        raise SystemExit(1)
 
-    gotify.create_message(
-        message=message,
-        title="Reminders for today",
-        priority=(int(sum(priority_calc) / len(priority_calc))),
-        extras=extras,
+
+def handle_cron_hit(
+    db: "DBSession", today: DTDate, catch_up: bool = False
+) -> dict[tuple[Recurring, DTDate], int]:
+    from remindotron.models import Reminder
+    from remindotron.queries import advance_group, due_groups, log_group
+    from remindotron.recurrence import next_occurrence
+
+    # Reminders with the same recurrence that are due on the same day all move
+    # to the same next date, so advance them with one UPDATE per
+    # (Recurring, date) pair inside the caller's transaction and report the
+    # touched rows. Without catch-up that is at most one pair per Recurring.
+    # Each group is first appended to the occurrence log, before the UPDATE
+    # moves it out of the filter.
+    now = datetime.now()
+    groups = db.execute(due_groups(today, catch_up)).all()
+
+    report: dict[tuple[Recurring, DTDate], int] = {}
+    for recurring, current in groups:
+        db.execute(log_group(today, catch_up, recurring, current, now))
+        values: dict[str, Any] = {
+            "occurrence_count": Reminder.occurrence_count + 1,
+            "last_occurrence": now,
+        }
+        if recurring != Recurring.ONCE:
+            values["date"] = next_occurrence(current, recurring, today)
+        result = db.execute(
+            advance_group(today, catch_up, recurring, current, values)
+        )
+        report[(recurring, current)] = result.rowcount
+        logger.debug(
+            f"Advanced {result.rowcount} {recurring} reminders from {current}"
+        )
+    return report
+
+
+def advance_due_reminders(
+    today: DTDate,
+    catch_up: bool = False,
+    silent: bool = False,
+    policy: "DigestPolicy | None" = None,
+) -> dict[tuple[Recurring, DTDate], int]:
+    """Advance the reminders due on `today` and queue their notifications
+    in one transaction. Errors are raised to the caller."""
+    from remindotron.notify import (
+        DueReminder,
+        build_digests,
+        enqueue_notifications,
     )
+    from remindotron.queries import due_reminders
+
+    with Session() as db, db.begin():
+        with profiler.phase("query"):
+            items = [
+                DueReminder._make(row)
+                for row in db.execute(due_reminders(today, catch_up))
+            ]
+        with profiler.phase("handle_cron_hit"):
+            report = handle_cron_hit(db, today, catch_up) if items else {}
+        # The notification is stored in the same transaction, so a crash
+        # or failed send never loses it once the reminders have advanced
+        if items and not silent:
+            with profiler.phase("notification enqueue"):
+                enqueue_notifications(db, build_digests(items, today, policy))
+
+    if items:
+        logger.info(
+            f"Found {len(items)} reminders for today: "
+            + ", ".join(item.name for item in items)
+        )
+        logger.info(
+            "Advanced reminders: "
+            + ", ".join(
+                f"{recurring}@{current}={count}"
+                for (recurring, current), count in report.items()
+            )
+        )
+    else:
+        logger.info("No items found for today")
+    return report
 
 
-def handle_cron_hit(reminders: list[Reminder]) -> None:
+def fire_due_reminders(
+    today: DTDate,
+    catch_up: bool = False,
+    silent: bool = False,
+    policy: "DigestPolicy | None" = None,
+    concurrency: int = 4,
+) -> dict[tuple[Recurring, DTDate], int]:
     try:
-        with Session() as db:
-            for item in reminders:
-                result = db.get(Reminder, item.id)
-                # SEND NOTIFICATION HERE
-                if not result:
-                    logger.error(
-                        f"Could not retrieve reminder with id {item.id}"
-                    )
-                    raise SystemExit(1)
-
-                # UPDATE OCCURENCE COUNT
-                result.occurrence_count += 1
-
-                # UPDATE DATE ACCORDING TO RECURRING VALUE
-                match item.recurring:
-                    case Recurring.ONCE:
-                        pass
-                    case Recurring.DAILY:
-                        result.date = item.date + relativedelta(days=1)
-                    case Recurring.WEEKLY:
-                        result.date = item.date + relativedelta(weeks=1)
-                    case Recurring.MONTHLY:
-                        result.date = item.date + relativedelta(months=1)
-                    case Recurring.QUARTERLY:
-                        result.date = item.date + relativedelta(months=3)
-                    case Recurring.YEARLY:
-                        result.date = item.date + relativedelta(years=1)
-                    case _:
-                        logger.error("item.recurring not found in Enum")
-                        raise ValueError("item.recurring not found in Enum")
-
-                # UPDATE LAST_OCCURRENCE
-                result.last_occurrence = datetime.now()
-            db.commit()
+        report = advance_due_reminders(today, catch_up, silent, policy)
     except Exception as e:
         logger.error(f"Error querying database: {e}")
         raise SystemExit(1) from e
 
+    if report:
+        if not silent:
+            logger.info("Sending notifications through Gotify")
+            drain_notifications(concurrency)
+        else:
+            logger.warning(
+                "The sending of notifications will be skipped in this run"
+            )
+    elif not silent:
+        # Retry notifications left behind by an earlier failed send
+        drain_notifications(concurrency, required=False)
+    return report
+
+
+def digest_policy(kwargs: dict[str, Any]) -> "DigestPolicy":
+    from remindotron.notify import DigestPolicy
+
+    return DigestPolicy(
+        kwargs["digest"], kwargs["max_items"], kwargs["max_bytes"]
+    )
+
+
+def require_positive(kwargs: dict[str, Any], *options: str) -> None:
+    for option in options:
+        if kwargs[option] is not None and kwargs[option] < 1:
+            logger.error(f"--{option.replace('_', '-')} must be >= 1")
+            raise SystemExit(1)
+
 
 def run_date_comparison(**kwargs: Any) -> None:
+    require_positive(kwargs, "concurrency")
+    fire_due_reminders(
+        datetime.now().date(),
+        kwargs.get("catch_up", False),
+        kwargs["silent"],
+        digest_policy(kwargs),
+        kwargs["concurrency"],
+    )
+
+
+def run_daemon(**kwargs: Any) -> None:
+    import signal
+    from functools import partial
+
+    from remindotron.daemon import Daemon
+
+    require_positive(kwargs, "concurrency")
+    for option in ("poll_interval", "send_interval"):
+        if kwargs[option] <= 0:
+            logger.error(f"--{option.replace('_', '-')} must be > 0")
+            raise SystemExit(1)
     try:
-        with Session() as db:
-            items = (
-                db.query(Reminder)
-                .where(Reminder.date == datetime.now().date())
-                .options(joinedload(Reminder.category))
-                .all()
+        fire_time = time.fromisoformat(kwargs["at"])
+    except ValueError as e:
+        logger.error(f"Time should be of format HH:MM: {e}")
+        raise SystemExit(1)
+
+    def send_pending(url: str, app_token: str) -> None:
+        from remindotron.notify import drain_outbox
+
+        report = drain_outbox(
+            Session, url, app_token, concurrency=kwargs["concurrency"]
+        )
+        if report.sent:
+            logger.info(f"Sent {report.sent} notifications through Gotify")
+        if report.failed:
+            logger.error(
+                f"{report.failed} notifications could not be sent and stay "
+                "in the outbox"
+            )
+
+    send = None
+    if kwargs["silent"]:
+        logger.warning("The sending of notifications will be skipped")
+    elif not GOTIFY_URL or not GOTIFY_APP_TOKEN:
+        logger.error("No valid Gotify credentials available")
+        logger.error(
+            "Notifications are kept in the outbox until the next send"
+        )
+    else:
+        send = partial(send_pending, GOTIFY_URL, GOTIFY_APP_TOKEN)
+
+    daemon = Daemon(
+        engine,
+        # A missed fire time (suspend, restart) is caught up on the next run;
+        # the notifications are sent by the daemon, not in the firing
+        lambda today: advance_due_reminders(
+            today,
+            catch_up=True,
+            silent=kwargs["silent"],
+            policy=digest_policy(kwargs),
+        ),
+        fire_time,
+        kwargs["poll_interval"],
+        send,
+        kwargs["send_interval"],
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    logger.info(f"Starting daemon, firing reminders at {fire_time}")
+    daemon.run()
+
+
+def fleet_databases(paths: list[str]) -> list[Path]:
+    import glob
+
+    databases: set[Path] = set()
+    for path in paths:
+        if Path(path).is_dir():
+            databases.update(Path(path).glob("*.db"))
+        else:
+            databases.update(Path(match) for match in glob.glob(path))
+    return sorted(database.resolve() for database in databases)
+
+
+def fire_database(
+    db_path: Path, kwargs: dict[str, Any]
+) -> tuple[Path, int, str | None]:
+    """Fire the due reminders of one database, in a fleet worker process.
+
+    Every database gets its own engine and session factory, and any failure
+    is returned instead of raised so one broken database cannot stop the
+    rest of the fleet."""
+    from sqlalchemy.orm import sessionmaker
+
+    from remindotron.database import make_engine, upgrade_schema
+
+    global Session, engine
+    engine = make_engine(db_path, DATABASE_PROFILE, DATABASE_PRAGMAS)
+    Session = sessionmaker(bind=engine)
+    try:
+        upgrade_schema(engine)
+        report = fire_due_reminders(
+            datetime.now().date(),
+            kwargs["catch_up"],
+            kwargs["silent"],
+            digest_policy(kwargs),
+            kwargs["concurrency"],
+        )
+        return db_path, sum(report.values()), None
+    except SystemExit:
+        return db_path, 0, "see the log above"
+    except Exception as e:
+        return db_path, 0, f"{type(e).__name__}: {str(e).splitlines()[0]}"
+    finally:
+        engine.dispose()
+
+
+def run_fleet(**kwargs: Any) -> None:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from time import perf_counter
+
+    from rich.table import Table
+
+    require_positive(kwargs, "workers", "concurrency")
+    databases = fleet_databases(kwargs["paths"])
+    if not databases:
+        logger.error(f"No databases found in {', '.join(kwargs['paths'])}")
+        raise SystemExit(1)
+
+    logger.info(
+        f"Running {len(databases)} databases with "
+        f"{kwargs['workers'] or os.cpu_count()} workers"
+    )
+    start = perf_counter()
+    results = []
+    # Workers are reused across databases, fire_database replaces the engine
+    # and session factory for every database it handles
+    with ProcessPoolExecutor(max_workers=kwargs["workers"]) as pool:
+        futures = [
+            pool.submit(fire_database, db_path, kwargs)
+            for db_path in databases
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    elapsed = perf_counter() - start
+
+    table = Table("Database", "Fired", "Status")
+    for db_path, fired, error in sorted(results):
+        table.add_row(str(db_path), str(fired), error or "ok")
+    get_console().print(table)
+
+    failed = sum(error is not None for _, _, error in results)
+    logger.info(
+        f"Processed {len(results)} databases in {elapsed:.2f}s: "
+        f"{sum(fired for _, fired, _ in results)} reminders fired, "
+        f"{failed} databases failed"
+    )
+    if failed:
+        raise SystemExit(1)
+
+
+def send_notifications(**kwargs: Any) -> None:
+    require_positive(kwargs, "concurrency")
+    drain_notifications(kwargs["concurrency"])
+
+
+def guess_format(path: str, file_format: str | None) -> str:
+    if file_format:
+        return file_format
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    logger.error(f"Cannot guess the format of {path}, use --format")
+    raise SystemExit(1)
+
+
+def row_progress(description: str) -> "Progress":
+    from rich.console import Console
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    return Progress(
+        SpinnerColumn(),
+        TextColumn(description),
+        TextColumn("{task.completed} rows"),
+        console=Console(stderr=True),
+        transient=False,
+    )
+
+
+def import_file(**kwargs: Any) -> None:
+    from remindotron.bulk import import_reminders, read_rows, validate_rows
+
+    require_positive(kwargs, "chunk_size")
+    path = kwargs["path"]
+    file_format = guess_format(path, kwargs["format"])
+    invalid = 0
+
+    def on_error(line_number: int, error: Exception) -> None:
+        nonlocal invalid
+        invalid += 1
+        logger.error(f"Skipping invalid line {line_number}: {error}")
+
+    stream = (
+        nullcontext(sys.stdin)
+        if path == "-"
+        else open(path, newline="", encoding="utf-8")
+    )
+    try:
+        with stream as f, row_progress("Importing") as progress:
+            task = progress.add_task("import", total=None)
+            imported = import_reminders(
+                Session,
+                validate_rows(read_rows(f, file_format, on_error), on_error),
+                kwargs["chunk_size"],
+                lambda count: progress.advance(task, count),
+            )
+    except OSError as e:
+        logger.error(f"Cannot read {path}: {e}")
+        raise SystemExit(1) from e
+    except Exception as e:
+        logger.error(f"Error writing to database: {e}")
+        raise SystemExit(1) from e
+
+    logger.info(f"Imported {imported} reminders from {path}")
+    if invalid:
+        logger.warning(f"Skipped {invalid} invalid rows")
+        raise SystemExit(1)
+
+
+def export_file(**kwargs: Any) -> None:
+    from remindotron.bulk import export_reminder_rows
+
+    require_positive(kwargs, "chunk_size")
+    path = kwargs["path"]
+    file_format = guess_format(path, kwargs["format"])
+    stream = (
+        nullcontext(sys.stdout)
+        if path == "-"
+        else open(path, "w", newline="", encoding="utf-8")
+    )
+    try:
+        with stream as f, row_progress("Exporting") as progress:
+            task = progress.add_task("export", total=None)
+            exported = export_reminder_rows(
+                Session,
+                f,
+                file_format,
+                kwargs["chunk_size"],
+                lambda count: progress.advance(task, count),
             )
+    except OSError as e:
+        logger.error(f"Cannot write {path}: {e}")
+        raise SystemExit(1) from e
     except Exception as e:
         logger.error(f"Error querying database: {e}")
         raise SystemExit(1) from e
 
-    if items:
-        logger.info(f"Found reminders for today: {items}")
-        handle_cron_hit(items)
-        if not kwargs["silent"]:
-            logger.info("Sending notification through Gotify")
-            send_gotify_notification(items)
-        else:
-            logger.warning(
-                "The sending of notifications will be skipped in this run"
+    if path != "-":
+        # Log records go to stdout as well, keep the exported data clean
+        logger.info(f"Exported {exported} reminders to {path}")
+
+
+def archive_old_rows(**kwargs: Any) -> None:
+    from remindotron.archive import archive, compact
+
+    if kwargs["older_than"] < 0 or kwargs["batch_size"] < 1:
+        logger.error(
+            "--older-than can't be negative, --batch-size must be >= 1"
+        )
+        raise SystemExit(1)
+    before = datetime.combine(
+        datetime.now().date() - timedelta(days=kwargs["older_than"]),
+        datetime.min.time(),
+    )
+    try:
+        with row_progress("Archiving") as progress:
+            task = progress.add_task("archive", total=None)
+            report = archive(
+                Session,
+                before,
+                kwargs["batch_size"],
+                lambda count: progress.advance(task, count),
             )
+        released = compact(engine)
+    except Exception as e:
+        logger.error(f"Error archiving: {e}")
+        raise SystemExit(1) from e
+
+    logger.info(
+        f"Archived {report.reminders} finished reminders and "
+        f"{report.occurrences} occurrences from before {before.date()}, "
+        f"released {released / 1_000_000:.1f} MB"
+    )
+
+
+def search_reminders(**kwargs: Any) -> None:
+    from rich.table import Table
+
+    from remindotron.queries import search_expression
+    from remindotron.queries import search_reminders as search_query
+
+    require_positive(kwargs, "limit")
+    if kwargs["offset"] < 0:
+        logger.error("--offset can't be negative")
+        raise SystemExit(1)
+    expression = search_expression(kwargs["query"])
+    if expression is None:
+        logger.error("Search needs at least one word")
+        raise SystemExit(1)
+
+    try:
+        with Session() as db:
+            result = db.execute(
+                search_query(expression, kwargs["limit"], kwargs["offset"])
+            ).all()[: kwargs["limit"]]
+    except Exception as e:
+        logger.error(f"Error querying database: {e}")
+        raise SystemExit(1) from e
+
+    if not result:
+        logger.error(f"No reminders found for {kwargs['query']!r}")
+        raise SystemExit(1)
+
+    table = Table(title=f"Reminders matching {kwargs['query']!r}")
+    for column in ("ID", "Name", "Category", "Date", "Recurring", "Priority"):
+        table.add_column(column)
+    for item in result:
+        table.add_row(
+            str(item.id),
+            item.name,
+            item.category or "",
+            str(item.date),
+            str(item.recurring),
+            str(item.priority),
+        )
+    get_console().print(table)
+
+
+def forecast_occurrences(**kwargs: Any) -> None:
+    import json
+
+    from rich.table import Table
+
+    from remindotron.queries import occurrence_groups
+    from remindotron.recurrence import forecast
+
+    try:
+        start = (
+            DTDate.fromisoformat(kwargs["from"]) if kwargs["from"] else None
+        )
+        end = DTDate.fromisoformat(kwargs["to"]) if kwargs["to"] else None
+    except ValueError as e:
+        logger.error(f"Date should be of format YYYY-MM-DD: {e}")
+        raise SystemExit(1)
+    start = start or datetime.now().date()
+    end = end or start + timedelta(days=kwargs["days"])
+    if end < start:
+        logger.error("--to should not be before --from")
+        raise SystemExit(1)
+
+    try:
+        with Session() as db:
+            groups = db.execute(occurrence_groups(start, end)).tuples().all()
+    except Exception as e:
+        logger.error(f"Error querying database: {e}")
+        raise SystemExit(1) from e
+    days = forecast(groups, start, end)
+
+    if kwargs["format"] == "json":
+        for day, counts in days.items():
+            print(
+                json.dumps(
+                    {
+                        "date": day.isoformat(),
+                        "count": sum(counts.values()),
+                        "by_recurring": counts,
+                    }
+                )
+            )
+        return
+
+    table = Table(
+        "Date",
+        "Total",
+        *(str(recurring) for recurring in Recurring),
+        title=f"Occurrences from {start} to {end}",
+    )
+    for day, counts in days.items():
+        table.add_row(
+            day.isoformat(),
+            str(sum(counts.values())),
+            *(str(counts.get(recurring, "")) for recurring in Recurring),
+        )
+    get_console().print(table)
+    logger.info(
+        f"{sum(sum(counts.values()) for counts in days.values())} "
+        f"occurrences on {len(days)} days"
+    )
+
+
+def explain_queries(**kwargs: Any) -> None:
+    from rich.table import Table
+
+    from remindotron.database import explain_query_plan
+    from remindotron.queries import builtin_queries
+
+    today = datetime.now().date()
+    full_scans = 0
+    with Session() as db:
+        conn = db.connection()
+        for name, statement in builtin_queries(today).items():
+            table = Table(title=name, title_justify="left")
+            table.add_column("id")
+            table.add_column("parent")
+            table.add_column("detail")
+            for node_id, parent, detail in explain_query_plan(conn, statement):
+                # "SCAN <table>" without an index walks the whole table
+                is_scan = detail.startswith("SCAN") and "INDEX" not in detail
+                full_scans += is_scan
+                table.add_row(
+                    str(node_id),
+                    str(parent),
+                    detail,
+                    style="red" if is_scan else None,
+                )
+            get_console().print(table)
+
+    if full_scans:
+        logger.warning(f"Found {full_scans} full table scans")
     else:
-        logger.info("No items found for today")
+        logger.info("No full table scans found")
 
 
 def check_or_create_db(db_path: Path) -> bool:
     just_created = False
 
     if not db_path.exists():
+        from rich.prompt import Confirm
+
         answer = Confirm.ask(
             f"Database doesn't seem to exist, do you want to create it at {db_path}?"
         )
@@ -285,15 +997,19 @@ def check_linger() -> None:
         if "Linger=yes" not in check_linger.stdout:
             raise subprocess.SubprocessError("Linger not enabled")
     except subprocess.SubprocessError as e:
+        from rich.text import Text
+
         logger.warning(e)
 
         warning_text = Text.from_ansi(
             "\33[31mWARNING! Lingering for tracker is not enabled, please run as root:\n\t\33[34m$ loginctl enable-linger $USER"
         )
-        console.print(warning_text)
+        get_console().print(warning_text)
 
 
 def install_systemd_units(**kwargs: Any) -> None:
+    from rich.prompt import Prompt
+
     gotify_url = Prompt.ask("What is your Gotify server url?")
     gotify_token = Prompt.ask("What is your Gotify token?")
     logger.warning(
@@ -350,6 +1066,8 @@ WantedBy=timers.target
 
 
 def remove_systemd_units(**kwargs: Any) -> None:
+    from rich.prompt import Confirm
+
     answer = Confirm.ask(
         "Are you sure you want to uninstall the systemd unit files and stop the timer?"
     )
@@ -365,12 +1083,25 @@ def remove_systemd_units(**kwargs: Any) -> None:
 
 
 ### ARGUMENTPARSER ###
+class VersionAction(argparse.Action):
+    # Like action="version", but only looks up the version when requested
+    def __init__(self, option_strings: list[str], **kwargs: Any) -> None:
+        kwargs.update(
+            nargs=0, dest=argparse.SUPPRESS, default=argparse.SUPPRESS
+        )
+        super().__init__(option_strings, **kwargs)
+
+    def __call__(self, parser: argparse.ArgumentParser, *args: Any) -> None:
+        from remindotron import __version__
+
+        parser.exit(message=f"{parser.prog} {__version__}\n")
+
+
 def get_arguments() -> dict[str, Any]:
     parser = argparse.ArgumentParser(prog="Remindotron")
     parser.add_argument(
         "--version",
-        action="version",
-        version=f"%(prog)s {__version__}",
+        action=VersionAction,
         help="show version",
     )
     parser.add_argument(
@@ -378,6 +1109,23 @@ def get_arguments() -> dict[str, Any]:
         action="store_true",
         help="show debug information",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time the phases of the command and show them",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        default="remindotron-profile.json",
+        help="JSON file for the --profile timings "
+        "(default: remindotron-profile.json)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PATH",
+        help="write cProfile stats of the command to PATH",
+    )
     subparsers = parser.add_subparsers(required=True)
 
     insert_parser = subparsers.add_parser(
@@ -405,6 +1153,36 @@ def get_arguments() -> dict[str, Any]:
         "show", help="Show all database items"
     )
     show_all_parser.set_defaults(func=show_all)
+    show_all_parser.add_argument(
+        "--limit", type=int, help="show at most this many reminders"
+    )
+    show_all_parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="number of reminders to skip (default: 0)",
+    )
+    show_all_parser.add_argument(
+        "--due-within",
+        type=int,
+        metavar="DAYS",
+        help="only reminders due between today and DAYS days from now",
+    )
+    show_all_parser.add_argument(
+        "--category", help="only reminders in this category"
+    )
+    show_all_parser.add_argument(
+        "--sort",
+        choices=SHOW_SORTS,
+        default="id",
+        help="order of the reminders (default: id)",
+    )
+    show_all_parser.add_argument(
+        "--format",
+        choices=SHOW_FORMATS,
+        default="table",
+        help="output format, json writes one object per line (default: table)",
+    )
 
     run_parser = subparsers.add_parser("run", help="Run the cronjob")
     run_parser.set_defaults(func=run_date_comparison)
@@ -413,12 +1191,199 @@ def get_arguments() -> dict[str, Any]:
         action="store_true",
         help="do not send external notifications",
     )
+    run_parser.add_argument(
+        "--catch-up",
+        action="store_true",
+        help="also fire overdue reminders once and move them past today",
+    )
+
+    fleet_parser = subparsers.add_parser(
+        "fleet", help="Run the cronjob for many databases in parallel"
+    )
+    fleet_parser.set_defaults(func=run_fleet, needs_database=False)
+    fleet_parser.add_argument(
+        "paths",
+        nargs="+",
+        help="directories of *.db files or glob patterns of database files",
+    )
+    fleet_parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    fleet_parser.add_argument(
+        "--silent",
+        action="store_true",
+        help="do not send external notifications",
+    )
+    fleet_parser.add_argument(
+        "--catch-up",
+        action="store_true",
+        help="also fire overdue reminders once and move them past today",
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="Keep running and fire reminders when they are due"
+    )
+    daemon_parser.set_defaults(func=run_daemon)
+    daemon_parser.add_argument(
+        "--at",
+        default="08:30",
+        help="time of day to fire the reminders of a date (default: 08:30)",
+    )
+    daemon_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60,
+        help="seconds between checks for new reminders (default: 60)",
+    )
+    daemon_parser.add_argument(
+        "--send-interval",
+        type=float,
+        default=300,
+        help="seconds between retries of notifications left in the outbox "
+        "(default: 300)",
+    )
+    daemon_parser.add_argument(
+        "--silent",
+        action="store_true",
+        help="do not send external notifications",
+    )
+
+    send_parser = subparsers.add_parser(
+        "send", help="Send the notifications waiting in the outbox"
+    )
+    send_parser.set_defaults(func=send_notifications)
+    for notify_parser in (
+        run_parser,
+        fleet_parser,
+        daemon_parser,
+        send_parser,
+    ):
+        notify_parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="maximum number of notifications in flight (default: 4)",
+        )
+    for digest_parser in (run_parser, fleet_parser, daemon_parser):
+        digest_parser.add_argument(
+            "--digest",
+            choices=DIGEST_STRATEGIES,
+            default="single",
+            help="how to split the due reminders into notifications "
+            "(default: single)",
+        )
+        digest_parser.add_argument(
+            "--max-items",
+            type=int,
+            help="maximum number of reminders per notification "
+            "(default: 50 with --digest chunked, otherwise unlimited)",
+        )
+        digest_parser.add_argument(
+            "--max-bytes",
+            type=int,
+            help="maximum message size of a notification in bytes",
+        )
 
     install_parser = subparsers.add_parser(
         "install", help="Install systemd unit files"
     )
     install_parser.set_defaults(func=install_systemd_units)
 
+    import_parser = subparsers.add_parser(
+        "import", help="Import reminders from a CSV or JSON Lines file"
+    )
+    import_parser.set_defaults(func=import_file)
+    import_parser.add_argument(
+        "path", help="file to import, or - to read from stdin"
+    )
+    export_parser = subparsers.add_parser(
+        "export", help="Export reminders to a CSV or JSON Lines file"
+    )
+    export_parser.set_defaults(func=export_file)
+    export_parser.add_argument(
+        "path", help="file to export to, or - to write to stdout"
+    )
+    for bulk_parser in (import_parser, export_parser):
+        bulk_parser.add_argument(
+            "--format",
+            choices=BULK_FORMATS,
+            help="file format (default: guessed from the file extension)",
+        )
+        bulk_parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="number of rows per database batch (default: 5000)",
+        )
+
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Move fired one-time reminders and old occurrences to the archive",
+    )
+    archive_parser.set_defaults(func=archive_old_rows)
+    archive_parser.add_argument(
+        "--older-than",
+        type=int,
+        default=365,
+        metavar="DAYS",
+        help="archive what was due or fired more than DAYS days ago "
+        "(default: 365)",
+    )
+    archive_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="number of rows moved per transaction (default: 5000)",
+    )
+
+    search_parser = subparsers.add_parser(
+        "search", help="Search reminders by name, description and category"
+    )
+    search_parser.set_defaults(func=search_reminders)
+    search_parser.add_argument("query", help="words to search for")
+    search_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="number of results to show (default: 20)",
+    )
+    search_parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="number of results to skip (default: 0)",
+    )
+
+    forecast_parser = subparsers.add_parser(
+        "forecast", help="Show how many reminders fire per day in a period"
+    )
+    forecast_parser.set_defaults(func=forecast_occurrences)
+    forecast_parser.add_argument(
+        "--from", help="first day, YYYY-MM-DD (default: today)"
+    )
+    forecast_parser.add_argument(
+        "--to", help="last day, YYYY-MM-DD (default: --days after --from)"
+    )
+    forecast_parser.add_argument(
+        "--days",
+        type=int,
+        default=90,
+        help="length of the period when --to is not given (default: 90)",
+    )
+    forecast_parser.add_argument(
+        "--format",
+        choices=("table", "json"),
+        default="table",
+        help="output format, json writes one line per day (default: table)",
+    )
+
+    explain_parser = subparsers.add_parser(
+        "explain", help="Show the query plan of the built-in queries"
+    )
+    explain_parser.set_defaults(func=explain_queries)
+
     uninstall_parser = subparsers.add_parser(
         "uninstall", help="Remove systemd unit files"
     )
@@ -427,35 +1392,115 @@ def get_arguments() -> dict[str, Any]:
     return vars(parser.parse_args())
 
 
-def main() -> None:
-    logger.setLevel(logging.INFO)
+def print_profile(report: dict[str, Any]) -> None:
+    from rich.table import Table
 
-    arguments = get_arguments()
+    table = Table(
+        "Phase",
+        "Calls",
+        "Seconds",
+        "Share",
+        title=f"Profile of {report['command']}",
+    )
+    total = report["total_seconds"] or 1
+    for name, phase in report["phases"].items():
+        table.add_row(
+            name,
+            str(phase["calls"]),
+            f"{phase['seconds']:.4f}",
+            f"{phase['seconds'] / total:.1%}",
+        )
+    table.add_row("total", "", f"{report['total_seconds']:.4f}", "100.0%")
+    get_console().print(table)
 
-    if arguments["debug"]:
-        logger.setLevel(logging.DEBUG)
-        logger.debug("Debug mode enabled")
+
+def run_command(arguments: dict[str, Any]) -> None:
+    with profiler.phase("import"):
+        from sqlalchemy.orm import sessionmaker
+
+        from remindotron.database import (
+            DEFAULT_PROFILE,
+            active_pragmas,
+            make_engine,
+            upgrade_schema,
+        )
+
+    if not arguments.get("needs_database", True):
+        # Subcommands like fleet open their databases themselves
+        arguments["func"](**arguments)
+        return
 
     ### Check and setup database ###
     if not DATABASE_LOCATION:
         raise ValueError("Could not find database location in environment")
     db_path = Path(DATABASE_LOCATION).expanduser().resolve()
-    empty_database = check_or_create_db(db_path)
+    with profiler.phase("check_or_create_db"):
+        empty_database = check_or_create_db(db_path)
 
-    global Session
-    engine = create_engine(
-        url=f"sqlite:///{db_path}?journal_mode=wal",
-        echo=arguments["debug"],
-    )
-    Session = sessionmaker(bind=engine)
+    global Session, engine
+    with profiler.phase("engine setup"):
+        try:
+            engine = make_engine(
+                db_path,
+                DATABASE_PROFILE,
+                DATABASE_PRAGMAS,
+                echo=arguments["debug"],
+            )
+        except ValueError as e:
+            logger.error(e)
+            raise SystemExit(1) from e
+        Session = sessionmaker(bind=engine)
+    if arguments["debug"]:
+        logger.debug(
+            f"SQLite profile {DATABASE_PROFILE or DEFAULT_PROFILE}: "
+            f"{active_pragmas(engine)}"
+        )
 
     if empty_database or db_path.stat().st_size == 0:
         logger.info("Databasefile empty; populating it now...")
-        Base.metadata.create_all(bind=engine)
+    with profiler.phase("schema upgrade"):
+        created = upgrade_schema(engine)
+    for item in created:
+        logger.info(f"Created missing table, index or trigger {item}")
 
     ### Start requested function ###
     arguments["func"](**arguments)
 
 
+def main() -> None:
+    logger.setLevel(logging.INFO)
+
+    arguments = get_arguments()
+
+    if arguments["debug"]:
+        logger.setLevel(logging.DEBUG)
+        logger.debug("Debug mode enabled")
+
+    if not (arguments["profile"] or arguments["cprofile"]):
+        run_command(arguments)
+        return
+
+    import cProfile
+
+    profiler.start()
+    cprofile = cProfile.Profile() if arguments["cprofile"] else None
+    try:
+        if cprofile:
+            cprofile.runcall(run_command, arguments)
+        else:
+            run_command(arguments)
+    finally:
+        # Also report runs that end in SystemExit, those are often the ones
+        # worth looking at
+        command = arguments["func"].__name__
+        if cprofile:
+            cprofile.dump_stats(arguments["cprofile"])
+            logger.info(f"Wrote cProfile stats to {arguments['cprofile']}")
+        if arguments["profile"]:
+            path = Path(arguments["profile_output"])
+            print_profile(profiler.write(path, command))
+            logger.info(f"Wrote phase timings to {path}")
+
+
 if __name__ == "__main__":
     main()
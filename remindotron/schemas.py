@@ -0,0 +1,177 @@
+"""Remindotron - schemas.py
+
+Copyright (C) 2025 Marnix Enthoven <info@marnixenthoven.nl>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>."""
+
+from datetime import date, datetime
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, model_validator
+
+# pydantic only accepts typing.TypedDict from Python 3.12 on
+from typing_extensions import TypedDict
+
+from remindotron.models import Recurring
+
+
+class ReminderCategoryBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    name: str
+
+
+class ReminderCategoryIn(ReminderCategoryBase):
+    pass
+
+
+class ReminderIn(BaseModel):
+    name: str
+    description: Optional[str]
+    date: date
+    priority: int
+    recurring: Recurring
+    category: ReminderCategoryBase
+
+
+class ReminderBase(ReminderIn):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    last_occurrence: Optional[datetime]
+    occurrence_count: int
+    created: datetime
+
+
+class ReminderCategorySummary(ReminderCategoryBase):
+    id: int
+    reminder_count: int
+    next_due: Optional[date]
+
+
+class ReminderCategoryWithReminders(ReminderCategorySummary):
+    reminders: list[ReminderBase]
+
+
+class ReminderOut(ReminderBase):
+    category: Optional[ReminderCategoryBase]  # type: ignore[assignment]
+
+
+class ReminderCategoryExport(ReminderCategoryBase):
+    type: Literal["category"] = "category"
+    id: int
+
+
+class ReminderExport(ReminderOut):
+    type: Literal["reminder"] = "reminder"
+
+
+class ReminderBatchResult(BaseModel):
+    index: int
+    id: int
+    name: str
+    category_id: int
+
+
+class ReminderPage(BaseModel):
+    items: list[ReminderOut]
+    next_cursor: Optional[str]
+
+
+class ReminderSearchPage(BaseModel):
+    items: list[ReminderOut]
+    next_offset: Optional[int]
+
+
+class UpcomingDay(BaseModel):
+    date: date
+    count: int
+    by_recurring: dict[Recurring, int]
+
+
+class Upcoming(BaseModel):
+    date_from: date
+    date_to: date
+    total: int
+    days: list[UpcomingDay]
+
+
+### ROWS ###
+# Plain-dict twins of the response models above, with the same fields in the
+# same order. Read endpoints build these from Core rows and serialize them
+# with a TypeAdapter, which only runs pydantic's serializer instead of
+# validating a model instance per reminder. Keys are written in the order of
+# the dict, so build them in field order to get the same JSON.
+class ReminderCategoryRow(TypedDict):
+    name: str
+
+
+class ReminderRow(TypedDict):
+    name: str
+    description: Optional[str]
+    date: date
+    priority: int
+    recurring: Recurring
+    category: Optional[ReminderCategoryRow]
+    id: int
+    last_occurrence: Optional[datetime]
+    occurrence_count: int
+    created: datetime
+
+
+class ReminderCategorySummaryRow(TypedDict):
+    name: str
+    id: int
+    reminder_count: int
+    next_due: Optional[date]
+
+
+class ReminderCategoryWithRemindersRow(ReminderCategorySummaryRow):
+    reminders: list[ReminderRow]
+
+
+class ReminderPageRow(TypedDict):
+    items: list[ReminderRow]
+    next_cursor: Optional[str]
+
+
+class ReminderSearchPageRow(TypedDict):
+    items: list[ReminderRow]
+    next_offset: Optional[int]
+
+
+class ReminderImport(BaseModel):
+    # One row of a CSV or JSON Lines import. Empty cells fall back to the
+    # defaults and the category may be a plain name or {"name": ...}, so
+    # lines from /export.ndjson can be imported as well.
+    name: str
+    description: Optional[str] = None
+    date: date
+    priority: int = 5
+    recurring: Recurring = Recurring.YEARLY
+    category: Optional[str] = None
+    last_occurrence: Optional[datetime] = None
+    occurrence_count: int = 0
+
+    @model_validator(mode="before")
+    @classmethod
+    def drop_empty_values(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        cleaned = {
+            key: value
+            for key, value in data.items()
+            if value is not None and value != ""
+        }
+        if isinstance(cleaned.get("category"), dict):
+            cleaned["category"] = cleaned["category"].get("name")
+        return cleaned
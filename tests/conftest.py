@@ -0,0 +1,30 @@
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+# remindotron.api opens its engine on import
+os.environ.setdefault(
+    "DATABASE_LOCATION",
+    str(Path(tempfile.mkdtemp(prefix="remindotron-tests-")) / "api.db"),
+)
+
+from remindotron.database import make_engine, upgrade_schema  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path: Path) -> Iterator[Engine]:
+    engine = make_engine(tmp_path / "remindotron.db")
+    upgrade_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine: Engine) -> Iterator[Session]:
+    with sessionmaker(bind=engine)() as db:
+        yield db
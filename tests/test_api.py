@@ -0,0 +1,40 @@
+from datetime import date
+from typing import NamedTuple
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from remindotron.api import app, decode_cursor, encode_cursor
+
+
+class Item(NamedTuple):
+    id: int
+    date: date
+
+
+def test_cursor_round_trip() -> None:
+    item = Item(42, date(2024, 2, 29))
+    cursor = encode_cursor(item)  # type: ignore[arg-type]
+    assert cursor == "2024-02-29_42"
+    assert decode_cursor(cursor) == (date(2024, 2, 29), 42)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", "2024-02-29", "2024-02-30_1", "2024-02-29_x", "a_b_c"]
+)
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def test_startup_upgrades_the_schema() -> None:
+    # The test database starts empty: search needs the FTS table and the
+    # ETag the data_version row, both made at startup
+    with TestClient(app) as client:
+        assert (
+            client.get("/reminders/search", params={"q": "x"}).json()["items"]
+            == []
+        )
+        assert client.get("/reminders").headers["etag"]
@@ -0,0 +1,67 @@
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import Engine, insert
+from sqlalchemy.orm import Session
+
+from remindotron.daemon import Daemon
+from remindotron.models import Notification, Reminder
+from remindotron.recurrence import Recurring
+from remindotron.remindotron import handle_cron_hit
+
+TODAY = date(2024, 6, 15)
+
+
+def add_reminder(engine: Engine, name: str, recurring: Recurring) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Reminder).values(
+                name=name,
+                date=TODAY,
+                recurring=recurring,
+                created=datetime(2024, 1, 1),
+            )
+        )
+
+
+@pytest.fixture
+def daemon(engine: Engine) -> Daemon:
+    def fire(today: date) -> dict[tuple[Recurring, date], int]:
+        with Session(engine) as db, db.begin():
+            return handle_cron_hit(db, today)
+
+    return Daemon(engine, fire, time(8, 30), poll_interval=60)
+
+
+def test_own_firing_is_not_a_change(engine: Engine, daemon: Daemon) -> None:
+    add_reminder(engine, "yearly", Recurring.YEARLY)
+    add_reminder(engine, "once", Recurring.ONCE)
+    with engine.connect() as conn:
+        assert daemon.changed(conn)
+        daemon.schedule.load(conn)
+        conn.rollback()
+        daemon.fire_due(datetime.combine(TODAY, time(9)))
+        assert not daemon.changed(conn)
+        assert daemon.schedule.heap == [date(2025, 6, 15)]
+
+
+def test_outbox_writes_are_not_a_change(
+    engine: Engine, daemon: Daemon
+) -> None:
+    with engine.connect() as conn:
+        daemon.changed(conn)
+        with engine.begin() as other:
+            other.execute(insert(Notification).values(title="t", message="m"))
+        assert not daemon.changed(conn)
+
+
+def test_writes_of_others_are_a_change(engine: Engine, daemon: Daemon) -> None:
+    add_reminder(engine, "yearly", Recurring.YEARLY)
+    with engine.connect() as conn:
+        daemon.changed(conn)
+        daemon.schedule.load(conn)
+        conn.rollback()
+        daemon.fire_due(datetime.combine(TODAY, time(9)))
+        # Added between the firing and the next check
+        add_reminder(engine, "added", Recurring.MONTHLY)
+        assert daemon.changed(conn)
@@ -0,0 +1,37 @@
+import pytest
+
+from remindotron.database import SQLITE_PROFILES, sqlite_pragmas
+
+
+def test_profile_defaults() -> None:
+    assert sqlite_pragmas() == SQLITE_PROFILES["durable"]
+    assert sqlite_pragmas("fast") == SQLITE_PROFILES["fast"]
+
+
+def test_overrides_are_applied() -> None:
+    pragmas = sqlite_pragmas(
+        "durable", " Cache_Size = -32000 ,busy_timeout=10000,"
+    )
+    assert pragmas["cache_size"] == "-32000"
+    assert pragmas["busy_timeout"] == "10000"
+    assert pragmas["synchronous"] == "FULL"
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        "user_version=3",
+        "cache_size=1; DROP TABLE reminders",
+        "journal_mode=",
+        "synchronous=FULL OFF",
+        "temp_store=MEMORY--",
+    ],
+)
+def test_invalid_overrides_are_rejected(overrides: str) -> None:
+    with pytest.raises(ValueError, match="Invalid database pragma"):
+        sqlite_pragmas(None, overrides)
+
+
+def test_unknown_profile_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown database profile"):
+        sqlite_pragmas("turbo")
@@ -0,0 +1,107 @@
+from datetime import date
+
+from remindotron.notify import (
+    DigestPolicy,
+    DueReminder,
+    build_digests,
+    chunk_lines,
+)
+
+TODAY = date(2024, 6, 15)
+HEADER = "**15-06-2024**\n\n"
+
+
+def reminders(count: int) -> list[DueReminder]:
+    return [
+        DueReminder(index, f"reminder {index}", 5, None)
+        for index in range(count)
+    ]
+
+
+def test_single_digest() -> None:
+    (notification,) = build_digests(
+        [
+            DueReminder(1, "dentist", 8, "health"),
+            DueReminder(2, "taxes", None, None),
+        ],
+        TODAY,
+    )
+    assert notification.title == "Reminders for today"
+    assert notification.message == (
+        HEADER + "- Health: dentist\n\n- taxes\n\n"
+    )
+    # The average of the known priorities
+    assert notification.priority == 8
+
+
+def test_chunked_digest_defaults_to_50_items() -> None:
+    notifications = build_digests(
+        reminders(120), TODAY, DigestPolicy("chunked")
+    )
+    assert [item.title for item in notifications] == [
+        "Reminders for today (1/3)",
+        "Reminders for today (2/3)",
+        "Reminders for today (3/3)",
+    ]
+    assert [item.message.count("- reminder") for item in notifications] == [
+        50,
+        50,
+        20,
+    ]
+
+
+def test_category_digest_groups() -> None:
+    notifications = build_digests(
+        [
+            DueReminder(1, "dentist", 5, "health"),
+            DueReminder(2, "taxes", 5, None),
+            DueReminder(3, "gym", 5, "health"),
+        ],
+        TODAY,
+        DigestPolicy("category"),
+    )
+    assert [item.title for item in notifications] == [
+        "Reminders for today: Health",
+        "Reminders for today: Uncategorized",
+    ]
+
+
+def test_priority_digest_orders_bands() -> None:
+    notifications = build_digests(
+        [
+            DueReminder(1, "low", 1, None),
+            DueReminder(2, "high", 9, None),
+            DueReminder(3, "default", None, None),
+        ],
+        TODAY,
+        DigestPolicy("priority"),
+    )
+    assert [item.title for item in notifications] == [
+        "Reminders for today: High priority",
+        "Reminders for today: Normal priority",
+        "Reminders for today: Low priority",
+    ]
+
+
+def test_chunk_lines_by_bytes() -> None:
+    lines = [(reminder, "x" * 10) for reminder in reminders(5)]
+    chunks = chunk_lines(lines, "h" * 5, None, 30)
+    # 5 bytes of header leave room for two 10-byte lines per chunk
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_chunk_lines_keeps_an_oversized_line() -> None:
+    lines = [(reminder, "x" * 50) for reminder in reminders(2)]
+    assert [len(chunk) for chunk in chunk_lines(lines, "", None, 10)] == [
+        1,
+        1,
+    ]
+
+
+def test_chunk_lines_by_items_and_bytes() -> None:
+    lines = [(reminder, "x") for reminder in reminders(7)]
+    assert [len(chunk) for chunk in chunk_lines(lines, "", 3, 100)] == [
+        3,
+        3,
+        1,
+    ]
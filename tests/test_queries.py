@@ -0,0 +1,121 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from remindotron import remindotron as cli
+from remindotron.models import Reminder
+from remindotron.queries import (
+    SHOW_SORTS,
+    due_filter,
+    occurrence_groups,
+    search_expression,
+)
+from remindotron.recurrence import Recurring
+
+TODAY = date(2024, 6, 15)
+
+
+def add_reminders(session: Session, rows: list[dict]) -> None:
+    session.execute(
+        insert(Reminder),
+        [{"created": datetime(2024, 1, 1), **row} for row in rows],
+    )
+    session.commit()
+
+
+def due_names(session: Session, catch_up: bool) -> set[str]:
+    return set(
+        session.scalars(
+            select(Reminder.name).where(due_filter(TODAY, catch_up))
+        )
+    )
+
+
+@pytest.fixture
+def reminders(session: Session) -> Session:
+    add_reminders(
+        session,
+        [
+            {"name": "today", "date": TODAY, "recurring": Recurring.YEARLY},
+            {
+                "name": "once today",
+                "date": TODAY,
+                "recurring": Recurring.ONCE,
+            },
+            {
+                "name": "overdue",
+                "date": date(2024, 6, 1),
+                "recurring": Recurring.MONTHLY,
+            },
+            {
+                "name": "once overdue",
+                "date": date(2024, 6, 1),
+                "recurring": Recurring.ONCE,
+            },
+            {
+                "name": "once fired",
+                "date": date(2024, 6, 1),
+                "recurring": Recurring.ONCE,
+                "occurrence_count": 1,
+            },
+            {
+                "name": "once fired today",
+                "date": TODAY,
+                "recurring": Recurring.ONCE,
+                "occurrence_count": 1,
+            },
+            {
+                "name": "tomorrow",
+                "date": date(2024, 6, 16),
+                "recurring": Recurring.DAILY,
+            },
+        ],
+    )
+    return session
+
+
+def test_due_filter_without_catch_up(reminders: Session) -> None:
+    assert due_names(reminders, catch_up=False) == {"today", "once today"}
+
+
+def test_due_filter_with_catch_up(reminders: Session) -> None:
+    assert due_names(reminders, catch_up=True) == {
+        "today",
+        "once today",
+        "overdue",
+        "once overdue",
+    }
+
+
+def test_occurrence_groups_skip_fired_once(reminders: Session) -> None:
+    groups = reminders.execute(
+        occurrence_groups(TODAY, date(2024, 7, 15))
+    ).tuples()
+    assert set(groups) == {
+        (Recurring.YEARLY, TODAY, 1),
+        (Recurring.ONCE, TODAY, 1),
+        (Recurring.MONTHLY, date(2024, 6, 1), 1),
+        (Recurring.DAILY, date(2024, 6, 16), 1),
+    }
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("dentist", '"dentist"*'),
+        ("call the dentist", '"call" "the" "dentist"*'),
+        # Operators and quotes are searched for literally
+        ('dentist OR "x" NOT y*', '"dentist" "OR" "x" "NOT" "y"*'),
+        ("über-café", '"über" "café"*'),
+        ("", None),
+        ('"*()', None),
+    ],
+)
+def test_search_expression(text: str, expected: str | None) -> None:
+    assert search_expression(text) == expected
+
+
+def test_show_sorts_match_the_cli_choices() -> None:
+    assert set(SHOW_SORTS) == set(cli.SHOW_SORTS)
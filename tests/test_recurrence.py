@@ -0,0 +1,185 @@
+from datetime import date
+
+import pytest
+
+from remindotron.recurrence import (
+    Recurring,
+    forecast,
+    next_occurrence,
+    occurrences,
+)
+
+
+@pytest.mark.parametrize(
+    ("current", "recurring", "today", "expected"),
+    [
+        (
+            date(2024, 1, 10),
+            Recurring.ONCE,
+            date(2024, 3, 1),
+            date(2024, 1, 10),
+        ),
+        (
+            date(2024, 1, 10),
+            Recurring.DAILY,
+            date(2024, 1, 5),
+            date(2024, 1, 11),
+        ),
+        (
+            date(2024, 1, 10),
+            Recurring.DAILY,
+            date(2024, 1, 10),
+            date(2024, 1, 11),
+        ),
+        (
+            date(2024, 1, 10),
+            Recurring.WEEKLY,
+            date(2024, 1, 31),
+            date(2024, 2, 7),
+        ),
+        # Month end and leap day are clamped to the last day of the month
+        (
+            date(2024, 1, 31),
+            Recurring.MONTHLY,
+            date(2024, 1, 31),
+            date(2024, 2, 29),
+        ),
+        (
+            date(2023, 1, 31),
+            Recurring.MONTHLY,
+            date(2023, 1, 31),
+            date(2023, 2, 28),
+        ),
+        (
+            date(2024, 2, 29),
+            Recurring.YEARLY,
+            date(2024, 3, 1),
+            date(2025, 2, 28),
+        ),
+        (
+            date(2024, 2, 29),
+            Recurring.YEARLY,
+            date(2027, 6, 1),
+            date(2028, 2, 29),
+        ),
+        # Four months elapsed: one quarter isn't past today, the second is
+        (
+            date(2024, 1, 15),
+            Recurring.QUARTERLY,
+            date(2024, 5, 20),
+            date(2024, 7, 15),
+        ),
+        (
+            date(2024, 1, 15),
+            Recurring.QUARTERLY,
+            date(2024, 4, 10),
+            date(2024, 4, 15),
+        ),
+        (
+            date(2024, 1, 15),
+            Recurring.QUARTERLY,
+            date(2024, 4, 15),
+            date(2024, 7, 15),
+        ),
+        (
+            date(2024, 11, 30),
+            Recurring.QUARTERLY,
+            date(2025, 1, 2),
+            date(2025, 2, 28),
+        ),
+        # Years behind costs one step
+        (
+            date(2015, 3, 1),
+            Recurring.MONTHLY,
+            date(2024, 7, 20),
+            date(2024, 8, 1),
+        ),
+        # Not yet due: still one period ahead
+        (
+            date(2024, 6, 1),
+            Recurring.MONTHLY,
+            date(2024, 1, 1),
+            date(2024, 7, 1),
+        ),
+    ],
+)
+def test_next_occurrence(
+    current: date, recurring: Recurring, today: date, expected: date
+) -> None:
+    assert next_occurrence(current, recurring, today) == expected
+
+
+def test_occurrences_keep_a_clamped_month_end() -> None:
+    # Advanced one period at a time like the run, so after February the
+    # reminder stays on the 29th
+    assert list(
+        occurrences(
+            date(2024, 1, 31),
+            Recurring.MONTHLY,
+            date(2024, 1, 1),
+            date(2024, 4, 30),
+        )
+    ) == [
+        date(2024, 1, 31),
+        date(2024, 2, 29),
+        date(2024, 3, 29),
+        date(2024, 4, 29),
+    ]
+
+
+def test_occurrences_of_a_leap_day() -> None:
+    assert list(
+        occurrences(
+            date(2024, 2, 29),
+            Recurring.YEARLY,
+            date(2025, 1, 1),
+            date(2026, 12, 31),
+        )
+    ) == [date(2025, 2, 28), date(2026, 2, 28)]
+
+
+def test_occurrences_quarterly_from_mid_period() -> None:
+    assert list(
+        occurrences(
+            date(2024, 1, 15),
+            Recurring.QUARTERLY,
+            date(2024, 5, 1),
+            date(2025, 1, 31),
+        )
+    ) == [date(2024, 7, 15), date(2024, 10, 15), date(2025, 1, 15)]
+
+
+def test_occurrences_by_days_skip_to_start() -> None:
+    assert list(
+        occurrences(
+            date(2024, 1, 1),
+            Recurring.WEEKLY,
+            date(2024, 1, 10),
+            date(2024, 1, 31),
+        )
+    ) == [date(2024, 1, 15), date(2024, 1, 22), date(2024, 1, 29)]
+
+
+def test_occurrences_once() -> None:
+    first = date(2024, 1, 10)
+    assert list(
+        occurrences(first, Recurring.ONCE, date(2024, 1, 1), date(2024, 1, 31))
+    ) == [first]
+    assert not list(
+        occurrences(first, Recurring.ONCE, date(2024, 2, 1), date(2024, 2, 28))
+    )
+
+
+def test_forecast_counts_per_day() -> None:
+    days = forecast(
+        [
+            (Recurring.DAILY, date(2024, 1, 1), 2),
+            (Recurring.ONCE, date(2024, 1, 2), 3),
+        ],
+        date(2024, 1, 1),
+        date(2024, 1, 2),
+    )
+    assert days == {
+        date(2024, 1, 1): {Recurring.DAILY: 2},
+        date(2024, 1, 2): {Recurring.DAILY: 2, Recurring.ONCE: 3},
+    }
@@ -0,0 +1,54 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from remindotron.models import Occurrence, Reminder
+from remindotron.recurrence import Recurring
+from remindotron.remindotron import handle_cron_hit
+
+TODAY = date(2024, 6, 15)
+
+
+def add_reminder(
+    session: Session, name: str, due: date, recurring: Recurring
+) -> None:
+    session.execute(
+        insert(Reminder).values(
+            name=name,
+            date=due,
+            recurring=recurring,
+            created=datetime(2024, 1, 1),
+        )
+    )
+    session.commit()
+
+
+@pytest.mark.parametrize("catch_up", [False, True])
+def test_same_day_fires_once_reminders_once(
+    session: Session, catch_up: bool
+) -> None:
+    add_reminder(session, "once", TODAY, Recurring.ONCE)
+    first = handle_cron_hit(session, TODAY, catch_up)
+    session.commit()
+    # The daemon fires a day again when a reminder for today is added
+    add_reminder(session, "added later", TODAY, Recurring.ONCE)
+    second = handle_cron_hit(session, TODAY, catch_up)
+    session.commit()
+
+    assert first == {(Recurring.ONCE, TODAY): 1}
+    assert second == {(Recurring.ONCE, TODAY): 1}
+    assert session.scalars(
+        select(Reminder.occurrence_count).order_by(Reminder.id)
+    ).all() == [1, 1]
+    assert session.scalar(select(func.count()).select_from(Occurrence)) == 2
+
+
+def test_catch_up_moves_a_recurring_reminder_past_today(
+    session: Session,
+) -> None:
+    add_reminder(session, "monthly", date(2024, 3, 31), Recurring.MONTHLY)
+    handle_cron_hit(session, TODAY, catch_up=True)
+    session.commit()
+    assert session.scalar(select(Reminder.date)) == date(2024, 6, 30)